@@ -1,105 +1,438 @@
 """A game-specific implementations of utility functions.
+
+The board is kept as two 64-bit integers (one per player). Square (x, y) is bit number 8 * x + y, so iterating the
+bits from low to high visits the squares in the same order as the classic "for x: for y:" loops.
 """
 from __future__ import print_function, division
+import random
 from .consts import *
 
 
+#===============================================================================
+# Bitboard helpers
+#===============================================================================
+FULL_MASK = (1 << 64) - 1
+
+# All squares except the ones on the y == 0 / y == 7 borders. Used to stop shifts from wrapping around a column.
+NOT_Y0_MASK = sum(1 << (8 * x + y) for x in range(BOARD_COLS) for y in range(1, BOARD_ROWS))
+NOT_Y7_MASK = sum(1 << (8 * x + y) for x in range(BOARD_COLS) for y in range(BOARD_ROWS - 1))
+INNER_Y_MASK = NOT_Y0_MASK & NOT_Y7_MASK
+
+# (shift, opponent mask) for each of the 8 directions. A positive shift is a left shift.
+DIRECTIONS = (
+    (1, INNER_Y_MASK),   # y + 1
+    (-1, INNER_Y_MASK),  # y - 1
+    (8, FULL_MASK),      # x + 1
+    (-8, FULL_MASK),     # x - 1
+    (9, INNER_Y_MASK),   # x + 1, y + 1
+    (-9, INNER_Y_MASK),  # x - 1, y - 1
+    (7, INNER_Y_MASK),   # x + 1, y - 1
+    (-7, INNER_Y_MASK),  # x - 1, y + 1
+)
+
+
+#===============================================================================
+# Zobrist keys
+# - A fixed seed keeps the keys identical across runs and processes, so they can be stored in books and shared tables.
+#===============================================================================
+_zobrist_random = random.Random(0x5EED)
+ZOBRIST_SQUARES = {
+    X_PLAYER: [_zobrist_random.getrandbits(64) for _ in range(BOARD_COLS * BOARD_ROWS)],
+    O_PLAYER: [_zobrist_random.getrandbits(64) for _ in range(BOARD_COLS * BOARD_ROWS)],
+}
+# XOR-ing this in turns the key of a disc of one color into the key of a disc of the other color.
+ZOBRIST_FLIP = [x_key ^ o_key for x_key, o_key in zip(ZOBRIST_SQUARES[X_PLAYER], ZOBRIST_SQUARES[O_PLAYER])]
+# Part of the key when O is the side to move.
+ZOBRIST_O_TO_MOVE = _zobrist_random.getrandbits(64)
+
+
+def _build_zobrist_bytes():
+    # ZOBRIST_BYTES[color][i][v] is the XOR of the square keys of the bits set in v, for the i-th byte of the bitboard
+    # (the squares with x == i). It computes a key from scratch with 16 lookups.
+    zobrist_bytes = {}
+    for color, squares in ZOBRIST_SQUARES.items():
+        zobrist_bytes[color] = []
+        for i in range(BOARD_COLS):
+            table = [0] * 256
+            for v in range(1, 256):
+                low = v & -v
+                table[v] = table[v ^ low] ^ squares[8 * i + low.bit_length() - 1]
+            zobrist_bytes[color].append(table)
+    return zobrist_bytes
+
+
+ZOBRIST_BYTES = _build_zobrist_bytes()
+
+
+def compute_key(x_bits, o_bits, curr_player):
+    """Computes the Zobrist key of a position from scratch."""
+    key = ZOBRIST_O_TO_MOVE if curr_player == O_PLAYER else 0
+    for color, bits in ((X_PLAYER, x_bits), (O_PLAYER, o_bits)):
+        for table, byte in zip(ZOBRIST_BYTES[color], bits.to_bytes(8, 'little')):
+            key ^= table[byte]
+    return key
+
+
+def square_bit(x, y):
+    return 1 << (8 * x + y)
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def iter_squares(bits):
+    """Yields the (x, y) coordinates of all set bits, from low to high."""
+    while bits:
+        low = bits & -bits
+        sq = low.bit_length() - 1
+        yield sq >> 3, sq & 7
+        bits ^= low
+
+
+def get_moves_mask(own, opp):
+    """Returns a bitmask of all the legal moves for the player owning 'own'."""
+    empty = ~(own | opp) & FULL_MASK
+    moves = 0
+    for shift, mask in DIRECTIONS:
+        masked_opp = opp & mask
+        if shift > 0:
+            t = masked_opp & (own << shift)
+            t |= masked_opp & (t << shift)
+            t |= masked_opp & (t << shift)
+            t |= masked_opp & (t << shift)
+            t |= masked_opp & (t << shift)
+            t |= masked_opp & (t << shift)
+            moves |= t << shift
+        else:
+            shift = -shift
+            t = masked_opp & (own >> shift)
+            t |= masked_opp & (t >> shift)
+            t |= masked_opp & (t >> shift)
+            t |= masked_opp & (t >> shift)
+            t |= masked_opp & (t >> shift)
+            t |= masked_opp & (t >> shift)
+            moves |= t >> shift
+    return moves & empty
+
+
+def _build_rays():
+    # For every square, the squares along each of the 8 directions, ordered from the nearest to the farthest. Rays
+    # shorter than 2 squares are dropped, since they can never contain a flip.
+    rays = []
+    for x in range(BOARD_COLS):
+        for y in range(BOARD_ROWS):
+            square_rays = []
+            for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+                ray = []
+                i, j = x + xdirection, y + ydirection
+                while 0 <= i < BOARD_COLS and 0 <= j < BOARD_ROWS:
+                    ray.append(square_bit(i, j))
+                    i += xdirection
+                    j += ydirection
+                if len(ray) >= 2:
+                    square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+# RAYS[8 * x + y] holds the rays of square (x, y), built once at import.
+RAYS = _build_rays()
+
+
+def get_flips_mask(own, opp, move_bit):
+    """Returns a bitmask of the discs flipped by playing 'move_bit'. Zero means the move is illegal."""
+    flips = 0
+    for ray in RAYS[move_bit.bit_length() - 1]:
+        line = 0
+        for bit in ray:
+            if bit & opp:
+                line |= bit
+            else:
+                if bit & own:
+                    flips |= line
+                break
+    return flips
+
+
+#===============================================================================
+# Board symmetries
+# - The 8 symmetries of the board are numbered 0-7. Transform t mirrors x if t & 1, then mirrors y if t & 2, and then
+#   swaps x and y if t & 4. Transform 0 is the identity.
+#===============================================================================
+SYMMETRIES = range(8)
+
+# Reverses the bits of a byte, to mirror the y coordinate of a whole bitboard row at once.
+_REVERSED_BYTES = bytes(int('{:08b}'.format(v)[::-1], 2) for v in range(256))
+
+
+def mirror_x(bits):
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def mirror_y(bits):
+    return int.from_bytes(bits.to_bytes(8, 'little').translate(_REVERSED_BYTES), 'little')
+
+
+def swap_xy(bits):
+    t = 0x0f0f0f0f00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits & FULL_MASK
+
+
+def transform_bits(bits, transform):
+    """Applies one of the 8 board symmetries to a bitboard."""
+    if transform & 1:
+        bits = mirror_x(bits)
+    if transform & 2:
+        bits = mirror_y(bits)
+    if transform & 4:
+        bits = swap_xy(bits)
+    return bits
+
+
+def transform_square(x, y, transform):
+    """Maps a square (e.g. a move) of a position to the matching square of the transformed position."""
+    if transform & 1:
+        x = BOARD_COLS - 1 - x
+    if transform & 2:
+        y = BOARD_ROWS - 1 - y
+    if transform & 4:
+        x, y = y, x
+    return [x, y]
+
+
+def inverse_transform_square(x, y, transform):
+    """Maps a square of the transformed position back to the original position."""
+    if transform & 4:
+        x, y = y, x
+    if transform & 2:
+        y = BOARD_ROWS - 1 - y
+    if transform & 1:
+        x = BOARD_COLS - 1 - x
+    return [x, y]
+
+
+#===============================================================================
+# Game state
+#===============================================================================
+
 class GameState:
     def __init__(self):
         """ Initializing the board and current player.
         """
-        self.board = []
         self.moves_played = ''
-        for i in range(BOARD_COLS):
-            self.board.append([EM] * BOARD_ROWS)
 
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                self.board[x][y] = EM
-        
         # Starting pieces:
-        self.board[3][3] = X_PLAYER
-        self.board[3][4] = O_PLAYER
-        self.board[4][3] = O_PLAYER
-        self.board[4][4] = X_PLAYER
-                    
+        self.x_bits = square_bit(3, 3) | square_bit(4, 4)
+        self.o_bits = square_bit(3, 4) | square_bit(4, 3)
+
         self.curr_player = X_PLAYER
-    
+        # 64-bit Zobrist key of the position and the side to move. Updated incrementally on every move, so it can be
+        # used as a key for transposition tables, evaluation caches and opening books.
+        self.key = compute_key(self.x_bits, self.o_bits, self.curr_player)
+        # Caches of the position, dropped on every move: the board view, the possible moves bitmask and list, and
+        # {square: flipped discs} of all the possible moves (filled by get_moves_with_flips).
+        self._board = None
+        self._moves_mask = None
+        self._moves = None
+        self._flips = None
+        # (move bit, flipped discs, key, caches) of every move done with make_move, so it can be taken back with
+        # undo_move.
+        self._undo_stack = []
+        # Optional incrementally maintained data, by name. See attach.
+        self.accumulators = {}
+
+    def attach(self, name, accumulator):
+        """Attaches an accumulator, which is kept up to date on every move and undo from now on. It must have the methods
+        on_move(color, sq, flips) and on_undo(color, sq, flips), called after the bitboards are updated, with the color
+        who made the move, its square number (8 * x + y) and the flipped discs bitmask. It must also have copy(), used
+        by GameState.copy.
+        """
+        self.accumulators[name] = accumulator
+
+    @property
+    def board(self):
+        """A list of lists view of the board, indexed board[x][y]. It is rebuilt lazily after each move, and must be
+        treated as read-only.
+        """
+        if self._board is None:
+            board = [[EM] * BOARD_ROWS for _ in range(BOARD_COLS)]
+            for x, y in iter_squares(self.x_bits):
+                board[x][y] = X_PLAYER
+            for x, y in iter_squares(self.o_bits):
+                board[x][y] = O_PLAYER
+            self._board = board
+        return self._board
+
+    def get_own_and_opponent_bits(self):
+        if self.curr_player == X_PLAYER:
+            return self.x_bits, self.o_bits
+        return self.o_bits, self.x_bits
+
     def isOnBoard(self, x, y):
     # Returns True if the coordinates are located on the board.
         return x >= 0 and x <= 7 and y >= 0 and y <=7
 
     def isValidMove(self, xstart, ystart):
-        if self.board[xstart][ystart] != EM or not self.isOnBoard(xstart, ystart):
-            return False
-
-        self.board[xstart][ystart] = self.curr_player # temporarily set the tile on the board.
-
-        tilesToFlip = []
-        for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
-            x, y = xstart, ystart
-            x += xdirection # first step in the direction
-            y += ydirection # first step in the direction
-            if self.isOnBoard(x, y) and self.board[x][y] == OPPONENT_COLOR[self.curr_player]:
-                # There is a piece belonging to the other player next to our piece.
-                x += xdirection
-                y += ydirection
-                if not self.isOnBoard(x, y):
-                    continue
-                while self.board[x][y] == OPPONENT_COLOR[self.curr_player]:
-                    x += xdirection
-                    y += ydirection
-                    if not self.isOnBoard(x, y): # break out of while loop, then continue in for loop
-                        break
-                if not self.isOnBoard(x, y):
-                    continue
-                if self.board[x][y] == self.curr_player:
-                    # There are pieces to flip over. Go in the reverse direction until we reach the original space, noting all the tiles along the way.
-                    while True:
-                        x -= xdirection
-                        y -= ydirection
-                        if x == xstart and y == ystart:
-                            break
-                        tilesToFlip.append([x, y])
-
-        self.board[xstart][ystart] = EM # restore the empty space
-        if len(tilesToFlip) == 0: # If no tiles were flipped, this is not a valid move.
+        flips = self._get_move_flips(xstart, ystart)
+        if not flips: # If no tiles were flipped, this is not a valid move.
             return False
-        return tilesToFlip
+        return [[x, y] for x, y in iter_squares(flips)]
 
+    def get_possible_moves_mask(self):
+        """Returns the bitmask of the possible moves. It is computed once per position."""
+        if self._moves_mask is None:
+            own, opp = self.get_own_and_opponent_bits()
+            self._moves_mask = get_moves_mask(own, opp)
+        return self._moves_mask
 
     def get_possible_moves(self):
-        validMoves = []
+        """Returns the possible moves as a list of [x, y]. The list is computed once per position and shared by all the
+        callers, so it must not be modified.
+        """
+        if self._moves is None:
+            self._moves = [[x, y] for x, y in iter_squares(self.get_possible_moves_mask())]
+        return self._moves
+
+    def mobility(self):
+        """Returns the number of possible moves."""
+        return popcount(self.get_possible_moves_mask())
 
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if self.isValidMove(x, y) != False:
-                    validMoves.append([x, y])
-        return validMoves
+    def empty_count(self):
+        """Returns the number of empty squares."""
+        return popcount(~(self.x_bits | self.o_bits) & FULL_MASK)
 
-    def perform_move(self, xstart, ystart):       
-        tilesToFlip = self.isValidMove(xstart, ystart)
-        if tilesToFlip == False:
+    def get_moves_with_flips(self):
+        """Returns the possible moves together with the discs each of them flips, in the order of get_possible_moves.
+        The flips are kept, so performing one of the moves next does not compute them again.
+
+        :return: A list of ([x, y], flipped discs bitmask) tuples.
+        """
+        own, opp = self.get_own_and_opponent_bits()
+        moves_with_flips = []
+        flips_by_square = {}
+        bits = self.get_possible_moves_mask()
+        while bits:
+            low = bits & -bits
+            sq = low.bit_length() - 1
+            flips = get_flips_mask(own, opp, low)
+            flips_by_square[sq] = flips
+            moves_with_flips.append(([sq >> 3, sq & 7], flips))
+            bits ^= low
+        self._flips = flips_by_square
+        if self._moves is None:
+            self._moves = [move for move, _ in moves_with_flips]
+        return moves_with_flips
+
+    def perform_move(self, xstart, ystart):
+        flips = self._get_move_flips(xstart, ystart)
+        if not flips:
             return False
-        
-        self.board[xstart][ystart] = self.curr_player
-        for x, y in tilesToFlip:
-            self.board[x][y] = self.curr_player
+        self._apply_move(xstart, ystart, flips)
+        return True
+
+    def make_move(self, xstart, ystart):
+        """Performs the move like perform_move, and records it so it can be taken back with undo_move.
+
+        :return: True if the move was performed, False if it is not a valid move.
+        """
+        flips = self._get_move_flips(xstart, ystart)
+        if not flips:
+            return False
+        self._undo_stack.append((square_bit(xstart, ystart), flips, self.key,
+                                 self._board, self._moves_mask, self._moves, self._flips))
+        self._apply_move(xstart, ystart, flips)
+        return True
+
+    def undo_move(self):
+        """Takes back the last move done with make_move."""
+        move_bit, flips, self.key, self._board, self._moves_mask, self._moves, self._flips = self._undo_stack.pop()
+        # Updating the current player back to the one who made the move.
+        self.curr_player = OPPONENT_COLOR[self.curr_player]
+        if self.curr_player == X_PLAYER:
+            self.x_bits ^= move_bit | flips
+            self.o_bits |= flips
+        else:
+            self.o_bits ^= move_bit | flips
+            self.x_bits |= flips
+        self.moves_played = self.moves_played[:-2]
+        if self.accumulators:
+            sq = move_bit.bit_length() - 1
+            for accumulator in self.accumulators.values():
+                accumulator.on_undo(self.curr_player, sq, flips)
+
+    def _get_move_flips(self, xstart, ystart):
+        # Returns the flipped discs bitmask of the move, or 0 if the move is not valid.
+        if not self.isOnBoard(xstart, ystart):
+            return 0
+        if self._flips is not None:
+            return self._flips.get(8 * xstart + ystart, 0)
+        move_bit = square_bit(xstart, ystart)
+        if self._moves_mask is not None and not self._moves_mask & move_bit:
+            return 0
+        own, opp = self.get_own_and_opponent_bits()
+        if (own | opp) & move_bit:
+            return 0
+        return get_flips_mask(own, opp, move_bit)
+
+    def _apply_move(self, xstart, ystart, flips):
+        sq = 8 * xstart + ystart
+        move_bit = 1 << sq
+        key = self.key ^ ZOBRIST_SQUARES[self.curr_player][sq] ^ ZOBRIST_O_TO_MOVE
+        bits = flips
+        while bits:
+            low = bits & -bits
+            key ^= ZOBRIST_FLIP[low.bit_length() - 1]
+            bits ^= low
+        self.key = key
+        if self.curr_player == X_PLAYER:
+            self.x_bits |= move_bit | flips
+            self.o_bits ^= flips
+        else:
+            self.o_bits |= move_bit | flips
+            self.x_bits ^= flips
+        self._board = None
+        self._moves_mask = None
+        self._moves = None
+        self._flips = None
+        if self.accumulators:
+            for accumulator in self.accumulators.values():
+                accumulator.on_move(self.curr_player, sq, flips)
         # Updating the current player.
         self.curr_player = OPPONENT_COLOR[self.curr_player]
         self.moves_played += str(xstart)
         self.moves_played += str(ystart)
-        return True
-    
+
+    def get_canonical(self):
+        """Returns the canonical form of the position: the smallest (x bits, o bits) pair among its 8 symmetries. All
+        the symmetric positions have the same canonical form.
+
+        :return: A tuple: (canonical x bits, canonical o bits, transform). transform_square(x, y, transform) maps a move
+                 of this position to the canonical one, and inverse_transform_square maps it back.
+        """
+        best = None
+        for transform in SYMMETRIES:
+            candidate = (transform_bits(self.x_bits, transform), transform_bits(self.o_bits, transform), transform)
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def canonical_key(self):
+        """Returns the Zobrist key of the canonical form and the side to move, shared by all the symmetric positions.
+        Use it instead of key to store one entry per equivalence class.
+        """
+        x_bits, o_bits, _ = self.get_canonical()
+        return compute_key(x_bits, o_bits, self.curr_player)
+
     def get_winner(self):
-        my_u = 0
-        op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if self.board[x][y] == self.curr_player:
-                    my_u += 1
-                if self.board[x][y] == OPPONENT_COLOR[self.curr_player]:
-                    op_u += 1
+        own, opp = self.get_own_and_opponent_bits()
+        my_u = popcount(own)
+        op_u = popcount(opp)
         if my_u > op_u:
             return self.curr_player
         elif my_u < op_u:
@@ -107,7 +440,25 @@ class GameState:
         else:
             return TIE
 
-        
+    def copy(self):
+        """A cheap copy of the state. Use it instead of copy.deepcopy. The copy starts with an empty undo stack."""
+        other = GameState.__new__(GameState)
+        other.moves_played = self.moves_played
+        other.x_bits = self.x_bits
+        other.o_bits = self.o_bits
+        other.curr_player = self.curr_player
+        other.key = self.key
+        other._board = None
+        other._moves_mask = self._moves_mask
+        other._moves = self._moves
+        other._flips = self._flips
+        other._undo_stack = []
+        other.accumulators = dict((name, accumulator.copy()) for name, accumulator in self.accumulators.items())
+        return other
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     def draw_board(self):
     # This function prints out the board that it was passed. Returns None.
         HLINE = '  +---+---+---+---+---+---+---+---+'
@@ -136,10 +487,8 @@ class GameState:
         """This object can be inserted into a set or as dict key. NOTICE: Changing the object after it has been inserted
         into a set or dict (as key) may have unpredicted results!!!
         """
-        return hash(','.join([self.board[(i,j)]
-                              for i in range(BOARD_ROWS)
-                              for j in range(BOARD_COLS)] + [self.curr_player]))
+        return self.key
 
     def __eq__(self, other):
-        return isinstance(other, GameState) and self.board == other.board and self.curr_player == other.curr_player
-
+        return isinstance(other, GameState) and self.key == other.key and self.x_bits == other.x_bits \
+               and self.o_bits == other.o_bits and self.curr_player == other.curr_player
@@ -0,0 +1,45 @@
+"""Compares the move generation speed of the bitboard GameState against the original list based implementation.
+
+Usage: python -m benchmarks.board [games] [seed]
+"""
+from __future__ import print_function, division
+import random
+import sys
+import time
+from Reversi.board import GameState
+from Reversi.list_board import ListGameState
+
+
+def play_random_games(state_class, games, seed):
+    """Plays random games to the end, generating the legal moves at every position.
+
+    :return: A tuple: (number of generated moves, number of performed moves, run time in seconds).
+    """
+    rng = random.Random(seed)
+    generated = performed = 0
+    start = time.time()
+    for _ in range(games):
+        state = state_class()
+        while True:
+            moves = state.get_possible_moves()
+            generated += len(moves)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            state.perform_move(move[0], move[1])
+            performed += 1
+    return generated, performed, time.time() - start
+
+
+def main(games=50, seed=0):
+    results = {}
+    for name, state_class in (('list', ListGameState), ('bitboard', GameState)):
+        generated, performed, run_time = play_random_games(state_class, games, seed)
+        results[name] = generated / run_time
+        print('{:>8}: {:7d} moves generated, {:5d} moves performed in {:.3f}s -> {:10.0f} moves/sec'.format(
+            name, generated, performed, run_time, results[name]))
+    print('speedup: {:.1f}x'.format(results['bitboard'] / results['list']))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,42 @@
+"""Measures the exact endgame solver: solve time, nodes and nodes/sec per position. First checks the parity ordering of
+the last 3 empty squares.
+
+Usage: python -m benchmarks.endgame [empties] [positions]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from itertools import combinations
+from endgame import EndgameSolver, QUADRANT_MASKS, parity_order_3
+from benchmarks.positions import endgame_positions
+
+
+def check_parity_order():
+    """Checks that for every 3 empty squares, a square alone in its quadrant is tried first if there is one."""
+    for squares in combinations(range(len(QUADRANT_MASKS)), 3):
+        empties = sum(1 << sq for sq in squares)
+        alone = [1 << sq for sq in squares if not QUADRANT_MASKS[sq] & empties & ~(1 << sq)]
+        order = parity_order_3(empties)
+        if sorted(order) != sorted(1 << sq for sq in squares) or (alone and order[0] not in alone):
+            raise AssertionError('squares {}: tried in the order {}'.format(squares, order))
+    print('parity order of 3 empty squares: ok')
+
+
+def main(empties=12, count=6):
+    check_parity_order()
+    total_nodes = 0
+    total_time = 0.0
+    for i, state in enumerate(endgame_positions(count, empties)):
+        solver = EndgameSolver()
+        start = time.time()
+        score, move = solver.best_move(state)
+        run_time = time.time() - start
+        total_nodes += solver.nodes
+        total_time += run_time
+        print('position {}: {} empties, best move {} with final disc difference {:+d}: {:9d} nodes in {:7.3f}s -> '
+              '{:7.0f} nodes/sec'.format(i, empties, move, score, solver.nodes, run_time, solver.nodes / run_time))
+    print('total: {} nodes in {:.3f}s -> {:.0f} nodes/sec'.format(total_nodes, total_time, total_nodes / total_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
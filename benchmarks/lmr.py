@@ -0,0 +1,66 @@
+"""Measures late-move reductions (reductions.LateMoveReductions) against the same search without them: the nodes and
+time to reach each depth, and how often the reduced search chooses the move of the full one, with how far its score is.
+
+Both searches are competition_player's: iterative deepening from depth 1 with principal variation search, aspiration
+windows, a transposition table and move ordering.
+
+Usage: python -m benchmarks.lmr [depth] [positions]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, INFINITY, aspiration_search
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+from reductions import LateMoveReductions
+from benchmarks.positions import benchmark_positions
+import players.competition_player
+
+Player = players.competition_player.Player
+
+
+def deepen(state, max_depth, late_move_reductions):
+    """Returns a list of (cumulative nodes, cumulative seconds, score, move) after each depth."""
+    state = state.copy()
+    player = Player(1, state.curr_player, 1, 1)
+    state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+    alpha_beta = MiniMaxWithAlphaBetaPruning(player.utilityBetter, state.curr_player, lambda: False, False,
+                                             TranspositionTable(Player.TT_SIZE_MB), MoveOrderer(), pvs=Player.USE_PVS,
+                                             late_move_reductions=late_move_reductions)
+    results = []
+    scores = []
+    start = time.time()
+    for depth in range(1, max_depth + 1):
+        guess = scores[-2] if len(scores) >= 2 else None
+        score, move = aspiration_search(alpha_beta.search, state, depth, guess, Player.ASPIRATION_WINDOW)
+        scores.append(score)
+        results.append((alpha_beta.nodes, time.time() - start, score, move))
+    return results
+
+
+def main(max_depth=7, count=12):
+    positions = benchmark_positions(count)
+    lmr = LateMoveReductions()
+    # Per depth: [full nodes, full time, reduced nodes, reduced time, same moves, score differences].
+    totals = [[0, 0.0, 0, 0.0, 0, 0.0] for _ in range(max_depth)]
+    for state in positions:
+        full_results = deepen(state, max_depth, None)
+        reduced_results = deepen(state, max_depth, lmr)
+        for depth, (full, reduced) in enumerate(zip(full_results, reduced_results)):
+            totals[depth][0] += full[0]
+            totals[depth][1] += full[1]
+            totals[depth][2] += reduced[0]
+            totals[depth][3] += reduced[1]
+            totals[depth][4] += full[3] == reduced[3]
+            if abs(full[2]) < INFINITY and abs(reduced[2]) < INFINITY:
+                totals[depth][5] += abs(full[2] - reduced[2])
+    print('depth  full: nodes    time  |   lmr: nodes    time  | same move  avg score diff')
+    for depth, (full_nodes, full_time, nodes, seconds, same, diff) in enumerate(totals):
+        print('{:5d}  {:11d} {:7.2f}s | {:11d} {:7.2f}s | {:5d}/{:<3d} {:10.2f}'.format(
+            depth + 1, full_nodes, full_time, nodes, seconds, same, count, diff / count))
+    print('{} moves reduced, {} of them searched again to the full depth'.format(lmr.reduced, lmr.re_searched))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""Compares the MTD(f) driver with the iterative deepening driver of competition_player (principal variation search and
+aspiration windows): the time to reach each depth and the nodes searched, on the same positions.
+
+Both drivers deepen from depth 1 with a transposition table and move ordering, and use the value of the iteration 2 plies
+shallower as their guess.
+
+Usage: python -m benchmarks.mtdf [depth] [positions]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, INFINITY, aspiration_search
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+from benchmarks.positions import benchmark_positions
+import players.competition_player
+
+Player = players.competition_player.Player
+
+
+def deepen(state, max_depth, driver):
+    """Returns a list of (cumulative nodes, cumulative seconds, score) after each depth."""
+    state = state.copy()
+    player = Player(1, state.curr_player, 1, 1)
+    state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+    alpha_beta = MiniMaxWithAlphaBetaPruning(player.utilityBetter, state.curr_player, lambda: False, False,
+                                             TranspositionTable(Player.TT_SIZE_MB), MoveOrderer(), pvs=Player.USE_PVS)
+    results = []
+    scores = []
+    start = time.time()
+    for depth in range(1, max_depth + 1):
+        guess = scores[-2] if len(scores) >= 2 else None
+        if driver == 'mtdf':
+            score, move = alpha_beta.mtdf(state, depth, guess if guess is not None else 0.0)
+        elif guess is not None:
+            score, move = aspiration_search(alpha_beta.search, state, depth, guess, Player.ASPIRATION_WINDOW)
+        else:
+            score, move = alpha_beta.search(state, depth, -INFINITY, INFINITY, True)
+        scores.append(score)
+        results.append((alpha_beta.nodes, time.time() - start, score))
+    return results
+
+
+def main(max_depth=6, count=12):
+    positions = benchmark_positions(count)
+    totals = {}
+    for driver in ('iterative', 'mtdf'):
+        totals[driver] = [[0, 0.0] for _ in range(max_depth)]
+        for state in positions:
+            for depth, (nodes, seconds, score) in enumerate(deepen(state, max_depth, driver)):
+                totals[driver][depth][0] += nodes
+                totals[driver][depth][1] += seconds
+    print('depth  iterative: nodes    time  |      mtdf: nodes    time')
+    for depth in range(max_depth):
+        (it_nodes, it_time), (mt_nodes, mt_time) = totals['iterative'][depth], totals['mtdf'][depth]
+        print('{:5d}  {:16d} {:7.2f}s |  {:16d} {:7.2f}s'.format(depth + 1, it_nodes, it_time, mt_nodes, mt_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""Measures the node-count reduction of the move ordering in MiniMaxWithAlphaBetaPruning.
+
+Each position is searched with iterative deepening from depth 1 to the given depth, like the alpha-beta players do, so
+the transposition table can provide the previous iteration's best move.
+
+Usage: python -m benchmarks.ordering [depth] [positions]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, INFINITY
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from benchmarks.positions import benchmark_positions
+import players.better_player
+
+
+CONFIGURATIONS = (
+    ('no ordering', False, None),
+    ('static', False, lambda: MoveOrderer(use_killers=False, use_history=False)),
+    ('transposition table only', True, None),
+    ('tt + killers + history + static', True, MoveOrderer),
+)
+
+
+def count_nodes(state, depth, use_tt, orderer_factory):
+    player = players.better_player.Player(1, state.curr_player, 1, 1)
+    tt = TranspositionTable(4) if use_tt else None
+    orderer = orderer_factory() if orderer_factory is not None else None
+    search = MiniMaxWithAlphaBetaPruning(player.utility, state.curr_player, lambda: False, False, tt, orderer)
+    for d in range(1, depth + 1):
+        score, move = search.search(state, d, -INFINITY, INFINITY, True)
+    return search.nodes, score
+
+
+def main(depth=4, count=12):
+    positions = benchmark_positions(count)
+    baseline = None
+    for name, use_tt, orderer_factory in CONFIGURATIONS:
+        start = time.time()
+        nodes = 0
+        for state in positions:
+            position_nodes, _ = count_nodes(state, depth, use_tt, orderer_factory)
+            nodes += position_nodes
+        run_time = time.time() - start
+        if baseline is None:
+            baseline = nodes
+        print('{:>32}: {:8d} nodes ({:5.1f}% of no ordering) in {:.2f}s'.format(
+            name, nodes, 100.0 * nodes / baseline, run_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
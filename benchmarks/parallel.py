@@ -0,0 +1,84 @@
+"""Measures the parallel searches (parallel.ParallelRootSearch and parallel.LazySMPSearch) against the serial search:
+the speedup in time and the search overhead in nodes, for several numbers of worker processes. For Lazy-SMP, it also
+reports the shared transposition table hit rate and collisions of every process.
+
+Each position is searched with competition_player's IterativeDeepening from depth 1 to the given depth, without a time
+limit. The pools are started before the timing, as the players keep theirs for the whole game. Speedups can only show
+with at least as many free cores as processes.
+
+Usage: python -m benchmarks.parallel [depth] [positions] [processes ...]
+"""
+from __future__ import print_function, division
+import multiprocessing
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, IterativeDeepening
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+from parallel import ParallelRootSearch, LazySMPSearch, NO_DEADLINE
+from benchmarks.positions import benchmark_positions
+import players.competition_player
+
+Player = players.competition_player.Player
+
+
+PARALLEL_SEARCHES = {'root': ParallelRootSearch, 'lazy_smp': LazySMPSearch}
+
+
+def search_positions(positions, depth, processes, mode='root'):
+    """Returns (nodes, seconds, {color: table statistics}) of searching all the positions, serially if processes is 0.
+    The statistics are only kept by Lazy-SMP.
+    """
+    nodes = 0
+    run_time = 0.0
+    parallel_searches = {}
+    for state in positions:
+        state = state.copy()
+        player = Player(1, state.curr_player, 1, 1)
+        state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+        alpha_beta = MiniMaxWithAlphaBetaPruning(player.utilityBetter, state.curr_player, lambda: False, False,
+                                                 TranspositionTable(Player.TT_SIZE_MB), MoveOrderer(),
+                                                 pvs=Player.USE_PVS)
+        parallel = None
+        if processes:
+            if state.curr_player not in parallel_searches:
+                parallel_searches[state.curr_player] = PARALLEL_SEARCHES[mode](
+                    processes, players.competition_player.worker_search, state.curr_player)
+                parallel_searches[state.curr_player].start()
+            parallel = parallel_searches[state.curr_player]
+            parallel.nodes = 0
+        deepening = IterativeDeepening(alpha_beta, lambda: False, lambda: NO_DEADLINE, Player.ASPIRATION_WINDOW,
+                                       parallel)
+        start = time.time()
+        deepening.run(state, state.get_possible_moves(), max_depth=depth + 1)
+        run_time += time.time() - start
+        nodes += alpha_beta.nodes + (parallel.nodes if parallel is not None else 0)
+    stats = {}
+    for color, parallel in parallel_searches.items():
+        if mode == 'lazy_smp':
+            stats[color] = parallel.stats()
+        parallel.close()
+    return nodes, run_time, stats
+
+
+def main(depth=5, count=12, *process_counts):
+    process_counts = process_counts or (1, 2, 4, 8)
+    positions = benchmark_positions(count)
+    print('{} cores available'.format(multiprocessing.cpu_count()))
+    serial_nodes, serial_time, _ = search_positions(positions, depth, 0)
+    print('{:>20}: {:8d} nodes in {:6.2f}s'.format('serial', serial_nodes, serial_time))
+    for mode in sorted(PARALLEL_SEARCHES, reverse=True):
+        for processes in process_counts:
+            nodes, run_time, stats = search_positions(positions, depth, processes, mode)
+            print('{:>8} {:>2} processes: {:8d} nodes in {:6.2f}s -> speedup {:4.2f}, search overhead {:+5.1f}%'.format(
+                mode, processes, nodes, run_time, serial_time / run_time, 100.0 * (nodes - serial_nodes) / serial_nodes))
+            for color, color_stats in sorted(stats.items()):
+                for process, table_stats in sorted(color_stats.items(), key=lambda item: str(item[0])):
+                    print('    {} {:>6}: {:8d} probes, hit rate {:5.1f}%, {:6d} collisions'.format(
+                        color, process, table_stats['probes'], 100.0 * table_stats['hit_rate'],
+                        table_stats['collisions']))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
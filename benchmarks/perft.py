@@ -0,0 +1,149 @@
+"""Perft: counts the leaf nodes of the game tree to a fixed depth, to check move generators for exact agreement and to
+compare their speed.
+
+A position without possible moves ends the game (there are no passes), so it counts as a single leaf.
+
+Usage: python -m benchmarks.perft [max_depth] [generator ...]
+Generators: bitboard (make_move / undo_move), flips (get_moves_with_flips + make_move / undo_move),
+            copy (GameState.copy + perform_move), list (the original list based board, copy.deepcopy + perform_move).
+"""
+from __future__ import print_function, division
+import copy
+import sys
+import time
+from Reversi.board import GameState
+from Reversi.list_board import ListGameState
+
+
+# (name, moves played from the start position, expected leaf counts for depth 1, 2, ...). The counts were produced by
+# the original list based board; the start position counts match the published Othello perft numbers.
+POSITIONS = (
+    ('start', '', (4, 12, 56, 244, 1396, 8200, 55092, 390216)),
+    ('opening', '24455463642572743523154655525716223626051432', (9, 114, 1302, 15333, 191543)),
+    ('midgame-1', '4252352515162414075103543245615364224113313063174657', (14, 167, 2329, 28032, 392101)),
+    ('midgame-2', '4232245251506254314546151421163022044036136041231235', (12, 185, 2028, 31712, 333245)),
+    ('late-midgame', '5352244535234241512213323060213161205412551000706315037374467165571464564704',
+     (7, 98, 690, 8946, 62016)),
+    ('endgame', '35255354151655322336246245567152637231141370650347260566022173012776746764416117460607225042376057',
+     (6, 45, 239, 1392, 6177)),
+)
+
+
+def state_from_moves(state_class, moves_played):
+    state = state_class()
+    for i in range(0, len(moves_played), 2):
+        if not state.perform_move(int(moves_played[i]), int(moves_played[i + 1])):
+            raise ValueError('Illegal move {} in {}'.format(moves_played[i:i + 2], moves_played))
+    return state
+
+
+def perft_bitboard(state, depth):
+    if depth == 0:
+        return 1
+    moves = state.get_possible_moves()
+    if not moves:
+        return 1
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        state.make_move(move[0], move[1])
+        nodes += perft_bitboard(state, depth - 1)
+        state.undo_move()
+    return nodes
+
+
+def perft_flips(state, depth):
+    if depth == 0:
+        return 1
+    moves_with_flips = state.get_moves_with_flips()
+    if not moves_with_flips:
+        return 1
+    if depth == 1:
+        return len(moves_with_flips)
+    nodes = 0
+    for move, _ in moves_with_flips:
+        state.make_move(move[0], move[1])
+        nodes += perft_flips(state, depth - 1)
+        state.undo_move()
+    return nodes
+
+
+def perft_copy(state, depth):
+    if depth == 0:
+        return 1
+    moves = state.get_possible_moves()
+    if not moves:
+        return 1
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        next_state = state.copy()
+        next_state.perform_move(move[0], move[1])
+        nodes += perft_copy(next_state, depth - 1)
+    return nodes
+
+
+def perft_list(state, depth):
+    if depth == 0:
+        return 1
+    moves = state.get_possible_moves()
+    if not moves:
+        return 1
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        next_state = copy.deepcopy(state)
+        next_state.perform_move(move[0], move[1])
+        nodes += perft_list(next_state, depth - 1)
+    return nodes
+
+
+# name -> (state class, perft function)
+GENERATORS = {
+    'bitboard': (GameState, perft_bitboard),
+    'flips': (GameState, perft_flips),
+    'copy': (GameState, perft_copy),
+    'list': (ListGameState, perft_list),
+}
+
+
+def run(generator, max_depth):
+    """Runs perft on all the pinned positions up to max_depth.
+
+    :return: A tuple: (True if all the counts match, total leaf nodes, total run time in seconds).
+    """
+    state_class, perft = GENERATORS[generator]
+    all_match = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, moves_played, expected_counts in POSITIONS:
+        state = state_from_moves(state_class, moves_played)
+        for depth, expected in enumerate(expected_counts[:max_depth], 1):
+            start = time.time()
+            nodes = perft(state, depth)
+            run_time = time.time() - start
+            total_nodes += nodes
+            total_time += run_time
+            if nodes != expected:
+                all_match = False
+                print('{} {} depth {}: {} leaves, expected {}'.format(generator, name, depth, nodes, expected))
+    return all_match, total_nodes, total_time
+
+
+def main(max_depth=5, *generators):
+    generators = generators or ('bitboard', 'flips', 'copy', 'list')
+    all_match = True
+    for generator in generators:
+        match, nodes, run_time = run(generator, max_depth)
+        all_match = all_match and match
+        print('{:>8}: {:8d} leaves in {:7.3f}s -> {:9.0f} nodes/sec  {}'.format(
+            generator, nodes, run_time, nodes / run_time, 'OK' if match else 'MISMATCH'))
+    return all_match
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sys.exit(0 if main(int(args[0]) if args else 5, *args[1:]) else 1)
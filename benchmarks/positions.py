@@ -0,0 +1,47 @@
+"""Reproducible benchmark positions.
+"""
+import random
+from Reversi.board import GameState
+
+
+def benchmark_positions(count=12, seed=0, min_ply=10, max_ply=40):
+    """Returns positions reached by random play from the start position, all with at least one legal move.
+
+    :param count: The number of positions.
+    :param seed: The random seed, so the same positions are returned on every call.
+    :param min_ply: The minimal number of moves played in a position.
+    :param max_ply: The maximal number of moves played in a position.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = GameState()
+        plies = rng.randint(min_ply, max_ply)
+        for _ in range(plies):
+            moves = state.get_possible_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            state.perform_move(move[0], move[1])
+        if state.get_possible_moves():
+            positions.append(state)
+    return positions
+
+
+def endgame_positions(count=6, empties=12, seed=0):
+    """Returns positions with the given number of empty squares, reached by random play from the start position, all
+    with at least one legal move.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = GameState()
+        while len(state.moves_played) // 2 < 60 - empties:
+            moves = state.get_possible_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            state.perform_move(move[0], move[1])
+        if len(state.moves_played) // 2 == 60 - empties and state.get_possible_moves():
+            positions.append(state)
+    return positions
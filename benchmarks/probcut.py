@@ -0,0 +1,57 @@
+"""Measures the depth Multi-ProbCut (probcut.MultiProbCut) reaches in a fixed time, against the same search without it.
+
+Each position is searched by competition_player's IterativeDeepening for the given number of seconds, with and without
+the pruning, using the models in probcut.MODELS_PATH. Also reports how often both searches choose the same move.
+
+Usage: python -m benchmarks.probcut [seconds] [positions]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, IterativeDeepening
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+from probcut import MultiProbCut
+from benchmarks.positions import benchmark_positions
+import players.competition_player
+
+Player = players.competition_player.Player
+
+
+def search_for(state, seconds, probcut):
+    """Returns (the depth reached, the best move, nodes) of searching a position for the given time."""
+    state = state.copy()
+    player = Player(1, state.curr_player, 1, 1)
+    state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+    deadline = time.time() + seconds
+    no_more_time = lambda: time.time() >= deadline
+    alpha_beta = MiniMaxWithAlphaBetaPruning(player.utilityBetter, state.curr_player, no_more_time, probcut,
+                                             TranspositionTable(Player.TT_SIZE_MB), MoveOrderer(), pvs=Player.USE_PVS)
+    deepening = IterativeDeepening(alpha_beta, no_more_time, lambda: deadline - time.time(), Player.ASPIRATION_WINDOW)
+    move = deepening.run(state, state.get_possible_moves())
+    return deepening.depth, move, alpha_beta.nodes
+
+
+def main(seconds=1.0, count=12):
+    positions = benchmark_positions(count)
+    probcut = MultiProbCut()
+    if not probcut.checks:
+        print('No models in the models file, run python -m probcut first')
+        return
+    plain_depths, probcut_depths, same_moves = 0, 0, 0
+    print('position  plain: depth    nodes | probcut: depth    nodes')
+    for i, state in enumerate(positions):
+        plain_depth, plain_move, plain_nodes = search_for(state, seconds, False)
+        probcut_depth, probcut_move, probcut_nodes = search_for(state, seconds, probcut)
+        plain_depths += plain_depth
+        probcut_depths += probcut_depth
+        same_moves += plain_move == probcut_move
+        print('{:8d} {:13d} {:8d} | {:14d} {:8d}'.format(i, plain_depth, plain_nodes, probcut_depth, probcut_nodes))
+    print('average depth: {:.2f} plain, {:.2f} probcut; same move in {} of {} positions; {} of {} checked nodes '
+          'cut'.format(plain_depths / float(count), probcut_depths / float(count), same_moves, count, probcut.cuts,
+                       probcut.probes))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:2]] + [int(arg) for arg in sys.argv[2:3]])
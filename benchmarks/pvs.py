@@ -0,0 +1,68 @@
+"""Measures the node savings of the principal variation search and of aspiration windows in
+MiniMaxWithAlphaBetaPruning.
+
+Each position is searched with iterative deepening from depth 1 to the given depth with a transposition table and move
+ordering, like the alpha-beta players do.
+
+Usage: python -m benchmarks.pvs [depth] [positions] [aspiration window]
+"""
+from __future__ import print_function, division
+import sys
+import time
+from utils import MiniMaxWithAlphaBetaPruning, INFINITY, aspiration_search
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+from benchmarks.positions import benchmark_positions
+import players.alpha_beta_player
+
+
+# (name, pvs, aspiration)
+CONFIGURATIONS = (
+    ('alpha-beta', False, False),
+    ('pvs', True, False),
+    ('aspiration', False, True),
+    ('pvs + aspiration', True, True),
+)
+
+
+def search_position(state, depth, pvs, window):
+    """Returns (nodes, root score, best move) of an iterative deepening search of a position."""
+    state = state.copy()
+    player = players.alpha_beta_player.Player(1, state.curr_player, 1, 1)
+    state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+    search = MiniMaxWithAlphaBetaPruning(player.utilityBetter, state.curr_player, lambda: False, False,
+                                         TranspositionTable(4), MoveOrderer(), pvs=pvs)
+    scores = []
+    for d in range(1, depth + 1):
+        if window:
+            score, move = aspiration_search(search.search, state, d, scores[-2] if d > 2 else None, window)
+        else:
+            score, move = search.search(state, d, -INFINITY, INFINITY, True)
+        scores.append(score)
+    return search.nodes, score, move
+
+
+def main(depth=5, count=12, window=4.0):
+    positions = benchmark_positions(count)
+    baseline = None
+    for name, pvs, aspiration in CONFIGURATIONS:
+        start = time.time()
+        nodes = 0
+        results = []
+        for state in positions:
+            position_nodes, score, move = search_position(state, depth, pvs, window if aspiration else None)
+            nodes += position_nodes
+            results.append((score, move))
+        run_time = time.time() - start
+        if baseline is None:
+            baseline = nodes, results
+        # The scores must not change. The moves may, between moves with equal scores.
+        same = all(abs(score - base_score) < 1e-6 for (score, _), (base_score, _) in zip(results, baseline[1]))
+        print('{:>18}: {:8d} nodes ({:5.1f}% of alpha-beta) in {:.2f}s, root scores {}'.format(
+            name, nodes, 100.0 * nodes / baseline[0], run_time, 'identical' if same else 'DIFFERENT'))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*[int(arg) for arg in args[:2]] + [float(arg) for arg in args[2:]])
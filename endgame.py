@@ -0,0 +1,214 @@
+"""Exact endgame solver.
+
+With few empty squares left, the whole game tree can be searched, and the exact final result replaces the heuristic
+scores. The solver is a negamax alpha-beta search on raw bitboards. The score of a position is the final disc difference
+from the point of view of the side to move. A side without possible moves ends the game (there are no passes), and the
+empty squares are not counted, like GameState.get_winner does.
+
+Speedups:
+- Principal variation search: after the first move, the moves are searched with a null window, which is enough to prove
+  them worse, and only re-searched when they turn out better. Disc differences are integers, so (alpha, alpha + 1) is a
+  null window.
+- Fastest-first ordering: moves that leave the opponent with fewer possible moves come first. They tend to be good, and
+  their subtrees are small.
+- Parity ordering: moves in a quadrant with an odd number of empty squares come first, so that we tend to get the last
+  move of each quadrant.
+- The last 3 empty squares are solved by dedicated functions that try the empty squares directly, without the move
+  generator, the ordering and the node bookkeeping.
+"""
+from __future__ import print_function, division
+from Reversi.board import FULL_MASK, get_moves_mask, get_flips_mask, popcount
+from Reversi.consts import BOARD_COLS, BOARD_ROWS
+
+
+# Lower than any final disc difference.
+MIN_SCORE = -(BOARD_COLS * BOARD_ROWS + 1)
+
+# QUADRANT_MASKS[sq] is the bitmask of the 4x4 quadrant of square sq.
+_QUADRANTS = [sum(1 << (8 * x + y) for x in range(x0, x0 + 4) for y in range(y0, y0 + 4))
+              for x0 in (0, 4) for y0 in (0, 4)]
+QUADRANT_MASKS = [next(quadrant for quadrant in _QUADRANTS if quadrant >> sq & 1)
+                  for sq in range(BOARD_COLS * BOARD_ROWS)]
+
+# Above this number of empty squares the moves are ordered fastest-first, which costs a move generation per move. Below
+# it, the parity ordering alone is cheaper.
+FASTEST_FIRST_EMPTIES = 6
+
+
+def parity_order_3(empties):
+    """Returns the bits of 3 empty squares in the order to try them: a square alone in its quadrant first (parity), the
+    rest from the lowest bit up.
+    """
+    first = empties & -empties
+    second = (empties ^ first) & -(empties ^ first)
+    third = empties ^ first ^ second
+    if not QUADRANT_MASKS[first.bit_length() - 1] & (second | third):
+        return first, second, third
+    if not QUADRANT_MASKS[second.bit_length() - 1] & (first | third):
+        return second, first, third
+    if not QUADRANT_MASKS[third.bit_length() - 1] & (first | second):
+        return third, first, second
+    return first, second, third
+
+
+class EndgameAborted(Exception):
+    """Raised inside the search when the time is up."""
+    pass
+
+
+class EndgameSolver:
+
+    # The time is checked once every this many nodes (a power of 2).
+    NODES_PER_TIME_CHECK = 1024
+
+    def __init__(self):
+        # Number of nodes visited, for statistics.
+        self.nodes = 0
+        self.no_more_time = None
+
+    def best_move(self, state, no_more_time=None, alpha=MIN_SCORE, beta=-MIN_SCORE):
+        """Solves a position exactly.
+
+        :param state: The position to solve. It must have at least one possible move.
+        :param no_more_time: A function that returns True when the search must stop, or None to never stop.
+        :param alpha: The alpha of the search window. Use (-1, 1) to only find out whether the position is won, lost or
+                      drawn, which is faster.
+        :param beta: The beta of the search window.
+        :return: A tuple: (the final disc difference for the side to move, the best move), or None if the time ran out.
+                 The score is exact if it is strictly inside the window, and a bound otherwise.
+        """
+        self.no_more_time = no_more_time
+        own, opp = state.get_own_and_opponent_bits()
+        empties = ~(own | opp) & FULL_MASK
+        try:
+            score, move_bit = self._search_root(own, opp, alpha, beta, empties, popcount(empties))
+        except EndgameAborted:
+            return None
+        finally:
+            self.no_more_time = None
+        sq = move_bit.bit_length() - 1
+        return score, [sq >> 3, sq & 7]
+
+    def solve(self, own, opp, alpha=MIN_SCORE, beta=-MIN_SCORE):
+        """Returns the fail-soft final disc difference of a position given as bitboards, for the player owning 'own'."""
+        empties = ~(own | opp) & FULL_MASK
+        return self._search(own, opp, alpha, beta, empties, popcount(empties))
+
+    def _ordered_children(self, own, opp, moves, empties, n_empties):
+        # Returns (order key, child own, child opp, move bit) of every move, best first. The child bitboards are from
+        # the point of view of the side to move in the child.
+        children = []
+        fastest_first = n_empties > FASTEST_FIRST_EMPTIES
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            flips = get_flips_mask(own, opp, bit)
+            child_opp = own | bit | flips
+            child_own = opp ^ flips
+            # 0 if the quadrant of the move has an odd number of empty squares, 1 otherwise.
+            order = 1 - (popcount(empties & QUADRANT_MASKS[bit.bit_length() - 1]) & 1)
+            if fastest_first:
+                order += 2 * popcount(get_moves_mask(child_own, child_opp))
+            children.append((order, child_own, child_opp, bit))
+        children.sort(key=lambda child: child[0])
+        return children
+
+    def _search_root(self, own, opp, alpha, beta, empties, n_empties):
+        children = self._ordered_children(own, opp, get_moves_mask(own, opp), empties, n_empties)
+        self.nodes += 1
+        best_score, best_bit = MIN_SCORE, children[0][3]
+        for i, (_, child_own, child_opp, bit) in enumerate(children):
+            score = self._search_child(child_own, child_opp, alpha, beta, empties ^ bit, n_empties - 1, i == 0)
+            if score > best_score:
+                best_score, best_bit = score, bit
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score, best_bit
+
+    def _search_child(self, child_own, child_opp, alpha, beta, empties, n_empties, first):
+        # Returns the score of a child from the parent's point of view, searching it with a null window unless it is the
+        # first child.
+        if first:
+            return -self._search(child_own, child_opp, -beta, -alpha, empties, n_empties)
+        score = -self._search(child_own, child_opp, -alpha - 1, -alpha, empties, n_empties)
+        if alpha < score < beta:
+            score = -self._search(child_own, child_opp, -beta, -score, empties, n_empties)
+        return score
+
+    def _search(self, own, opp, alpha, beta, empties, n_empties):
+        if n_empties <= 3:
+            if n_empties == 3:
+                return self._solve_3(own, opp, alpha, beta, empties)
+            if n_empties == 2:
+                low = empties & -empties
+                return self._solve_2(own, opp, alpha, beta, low, empties ^ low)
+            if n_empties == 1:
+                return self._solve_1(own, opp, empties)
+            return popcount(own) - popcount(opp)
+        self.nodes += 1
+        if not self.nodes & (EndgameSolver.NODES_PER_TIME_CHECK - 1) and self.no_more_time is not None \
+                and self.no_more_time():
+            raise EndgameAborted
+        moves = get_moves_mask(own, opp)
+        if not moves:
+            return popcount(own) - popcount(opp)
+        best_score = MIN_SCORE
+        first = True
+        for _, child_own, child_opp, bit in self._ordered_children(own, opp, moves, empties, n_empties):
+            score = self._search_child(child_own, child_opp, alpha, beta, empties ^ bit, n_empties - 1, first)
+            first = False
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _solve_3(self, own, opp, alpha, beta, empties):
+        self.nodes += 1
+        first, second, third = parity_order_3(empties)
+        best_score = MIN_SCORE
+        for bit, rest_a, rest_b in ((first, second, third), (second, first, third), (third, first, second)):
+            flips = get_flips_mask(own, opp, bit)
+            if not flips:
+                continue
+            score = -self._solve_2(opp ^ flips, own | bit | flips, -beta, -alpha, rest_a, rest_b)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if best_score == MIN_SCORE:
+            # No possible moves, the game is over.
+            return popcount(own) - popcount(opp)
+        return best_score
+
+    def _solve_2(self, own, opp, alpha, beta, first, second):
+        self.nodes += 1
+        best_score = MIN_SCORE
+        flips = get_flips_mask(own, opp, first)
+        if flips:
+            best_score = -self._solve_1(opp ^ flips, own | first | flips, second)
+            if best_score >= beta:
+                return best_score
+        flips = get_flips_mask(own, opp, second)
+        if flips:
+            score = -self._solve_1(opp ^ flips, own | second | flips, first)
+            if score > best_score:
+                best_score = score
+        if best_score == MIN_SCORE:
+            return popcount(own) - popcount(opp)
+        return best_score
+
+    def _solve_1(self, own, opp, last):
+        self.nodes += 1
+        flips = get_flips_mask(own, opp, last)
+        if not flips:
+            return popcount(own) - popcount(opp)
+        # The board is full after the move.
+        flipped = popcount(flips)
+        return popcount(own) + 1 + flipped - (popcount(opp) - flipped)
@@ -0,0 +1,55 @@
+"""A bounded cache of utility values for the searches.
+
+Iterative deepening evaluates many of the same positions again at every new depth, and transpositions reach them more
+than once within a search. The cache is keyed by the Zobrist key of the position, which includes the side to move, so
+it is only valid for utilities that are a pure function of the position (and of the color of the searching player, so
+every player needs its own cache).
+"""
+from collections import OrderedDict
+from functools import partial
+
+
+class EvalCache:
+
+    def __init__(self, max_entries=1 << 16):
+        """Initialize an empty cache.
+
+        :param max_entries: The number of values kept. When it is full, the least recently used value is evicted.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, utility, state):
+        """Returns utility(state), from the cache if it is there.
+
+        :param utility: The utility function, which gets the state as its only parameter.
+        :param state: The position to evaluate.
+        """
+        key = state.key
+        entries = self.entries
+        score = entries.get(key)
+        if score is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return score
+        self.misses += 1
+        score = utility(state)
+        entries[key] = score
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return score
+
+    def wrap(self, utility):
+        """Returns a utility function that goes through the cache. It can be pickled, like the players that use it."""
+        return partial(self.evaluate, utility)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
@@ -0,0 +1,115 @@
+"""Vectorized building blocks for the board heuristics.
+
+The heuristics work on an int8 view of the board, indexed [x][y]: 1 for the evaluating player's discs, -1 for the
+opponent's discs and 0 for empty squares. Batched evaluators get a stack of such boards, shaped (N, 8, 8), and return N
+scores.
+"""
+import numpy as np
+from Reversi.consts import X_PLAYER, BOARD_COLS, BOARD_ROWS
+from Reversi.board import get_moves_mask
+
+
+def board_array(state, color):
+    """Returns the int8 view of the board from the point of view of 'color'."""
+    if color == X_PLAYER:
+        mine, theirs = state.x_bits, state.o_bits
+    else:
+        mine, theirs = state.o_bits, state.x_bits
+    board = _bits_array(mine)
+    board -= _bits_array(theirs)
+    return board
+
+
+def _bits_array(bits):
+    return np.unpackbits(np.frombuffer(bits.to_bytes(8, 'little'), dtype=np.uint8),
+                         bitorder='little').reshape(BOARD_COLS, BOARD_ROWS).view(np.int8)
+
+
+def weighted_sums(board, score_mat):
+    """Returns the scoreMat weighted sums and the disc counts of both players. Works on a single (8, 8) board, and on a
+    stack of (N, 8, 8) boards, in which case every returned value is an array of length N.
+
+    :return: A list: [my weights, opponent weights, my discs, opponent discs].
+    """
+    mine = board == 1
+    theirs = board == -1
+    return [(mine * score_mat).sum(axis=(-2, -1)), (theirs * score_mat).sum(axis=(-2, -1)),
+            mine.sum(axis=(-2, -1)), theirs.sum(axis=(-2, -1))]
+
+
+def frontier_counts(board):
+    """Returns [my frontier discs, opponent frontier discs]. A frontier disc has an empty square among its 8 neighbours.
+    Works on a single board and on a stack of boards, like weighted_sums.
+    """
+    empty = np.zeros(board.shape[:-2] + (BOARD_COLS + 2, BOARD_ROWS + 2), dtype=bool)
+    empty[..., 1:-1, 1:-1] = board == 0
+    # 3x3 dilation of the empty squares, done as a 3-wide dilation along x and then along y.
+    rows = empty[..., :-2, :] | empty[..., 1:-1, :] | empty[..., 2:, :]
+    near_empty = rows[..., :-2] | rows[..., 1:-1] | rows[..., 2:]
+    return [(near_empty & (board == 1)).sum(axis=(-2, -1)), (near_empty & (board == -1)).sum(axis=(-2, -1))]
+
+
+# Flat board indices of the 4 edge lines walked by edge_run_counts: along x from (0, 0), along y from (0, 0), along x
+# from (7, 7) and along y from (7, 7).
+_EDGE_LINES = np.array([[BOARD_ROWS * x for x in range(BOARD_COLS)],
+                        [y for y in range(BOARD_ROWS)],
+                        [BOARD_ROWS * x + BOARD_ROWS - 1 for x in reversed(range(BOARD_COLS))],
+                        [BOARD_ROWS * (BOARD_COLS - 1) + y for y in reversed(range(BOARD_ROWS))]])
+
+
+def edge_run_counts(board):
+    """Returns [my run lengths, opponent run lengths] of the same-colored runs that start at the (0, 0) and (7, 7)
+    corners and go along the edges, as countUnemptyColRow of the players counts them. Works on a single board and on
+    a stack of boards, like weighted_sums.
+    """
+    lines = board.reshape(board.shape[:-2] + (BOARD_COLS * BOARD_ROWS,))[..., _EDGE_LINES]
+    same = lines == lines[..., :1]
+    runs = np.where(same.all(axis=-1), BOARD_COLS, same.argmin(axis=-1))
+    first = lines[..., 0]
+    return [(runs * (first == 1)).sum(axis=-1), (runs * (first == -1)).sum(axis=-1)]
+
+
+def decay_table(decay_initial, score_one_tile, decay_factor):
+    """Returns the scoreMat multiplier of a position by its number of discs, as an array indexed by the disc count.
+
+    The decay falls linearly as the board fills up: decay_initial - score_one_tile * discs / decay_factor. It only
+    depends on the position, so it can be used by concurrent evaluations and its scores can be cached.
+    """
+    return decay_initial - score_one_tile * np.arange(BOARD_COLS * BOARD_ROWS + 1) / float(decay_factor)
+
+
+def children_boards(state, color, moves):
+    """Returns the boards of all the children of a position, for batched evaluation.
+
+    :param state: The parent position.
+    :param color: The player the boards are viewed by (see board_array).
+    :param moves: The moves leading to the children, a subset of state.get_possible_moves().
+    :return: A tuple: (an (N, 8, 8) int8 array of the child boards, an (N,) bool array that is True where the side to move
+             in the child has no possible moves).
+    """
+    flips_by_square = dict((8 * move[0] + move[1], flips) for move, flips in state.get_moves_with_flips())
+    own, opp = state.get_own_and_opponent_bits()
+    child_bits = []
+    no_moves = np.empty(len(moves), dtype=bool)
+    for i, move in enumerate(moves):
+        sq = 8 * move[0] + move[1]
+        flips = flips_by_square[sq]
+        child_own = own | (1 << sq) | flips
+        child_opp = opp ^ flips
+        no_moves[i] = get_moves_mask(child_opp, child_own) == 0
+        child_bits.append((child_own, child_opp))
+    if color == state.curr_player:
+        mine = [child_own for child_own, _ in child_bits]
+        theirs = [child_opp for _, child_opp in child_bits]
+    else:
+        mine = [child_opp for _, child_opp in child_bits]
+        theirs = [child_own for child_own, _ in child_bits]
+    boards = _stack_bits_arrays(mine)
+    boards -= _stack_bits_arrays(theirs)
+    return boards, no_moves
+
+
+def _stack_bits_arrays(bits_list):
+    data = b''.join(bits.to_bytes(8, 'little') for bits in bits_list)
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8),
+                         bitorder='little').reshape(len(bits_list), BOARD_COLS, BOARD_ROWS).view(np.int8)
@@ -0,0 +1,136 @@
+"""Evaluation features kept up to date incrementally on every move.
+
+A move changes only the placed square and the flipped discs, so the disc counts, scoreMat weighted sums and empty count
+are updated from those alone. The frontier is recomputed from the accumulator's own bitboards with a few shifts.
+Attach a FeatureAccumulator to a GameState and the heuristics read the features in O(1) instead of scanning the board.
+"""
+from Reversi.board import FULL_MASK, NOT_Y0_MASK, NOT_Y7_MASK, popcount
+from Reversi.consts import X_PLAYER, BOARD_COLS, BOARD_ROWS
+
+
+def frontier_mask(x_bits, o_bits):
+    """Returns a bitmask of the frontier discs - the discs with an empty square among their 8 neighbours."""
+    occupied = x_bits | o_bits
+    empty = ~occupied & FULL_MASK
+    # 3x3 dilation of the empty squares, done as a 3-wide dilation along x and then along y.
+    rows = empty | (empty << 8) | (empty >> 8)
+    near_empty = rows | ((rows & NOT_Y7_MASK) << 1) | ((rows & NOT_Y0_MASK) >> 1)
+    return near_empty & occupied
+
+
+# The bits of the 4 edge lines walked by edge_runs, in the order of evaluation.edge_run_counts.
+EDGE_LINE_BITS = (
+    [1 << (BOARD_ROWS * x) for x in range(BOARD_COLS)],
+    [1 << y for y in range(BOARD_ROWS)],
+    [1 << (BOARD_ROWS * x + BOARD_ROWS - 1) for x in reversed(range(BOARD_COLS))],
+    [1 << (BOARD_ROWS * (BOARD_COLS - 1) + y) for y in reversed(range(BOARD_ROWS))],
+)
+
+
+def edge_runs(x_bits, o_bits):
+    """Returns [X run lengths, O run lengths] of the same-colored runs that start at the (0, 0) and (7, 7) corners and
+    go along the edges, like evaluation.edge_run_counts.
+    """
+    runs = [0, 0]
+    for line in EDGE_LINE_BITS:
+        if x_bits & line[0]:
+            side, bits = 0, x_bits
+        elif o_bits & line[0]:
+            side, bits = 1, o_bits
+        else:
+            continue
+        for bit in line:
+            if not bits & bit:
+                break
+            runs[side] += 1
+    return runs
+
+
+class FeatureAccumulator:
+    """Keeps the disc count, scoreMat weighted sum and frontier count of each player, and the empty count, of a
+    GameState. Attach it with state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, score_mat)).
+    """
+
+    NAME = 'features'
+
+    def __init__(self, state, score_mat):
+        """
+        :param state: The position to start from.
+        :param score_mat: The square weights, indexed [x][y].
+        """
+        self.weights = [float(score_mat[sq >> 3][sq & 7]) for sq in range(BOARD_COLS * BOARD_ROWS)]
+        self.x_bits = state.x_bits
+        self.o_bits = state.o_bits
+        self.x_discs = popcount(self.x_bits)
+        self.o_discs = popcount(self.o_bits)
+        self.x_weighted = self._weighted_sum(self.x_bits)
+        self.o_weighted = self._weighted_sum(self.o_bits)
+        self.empties = BOARD_COLS * BOARD_ROWS - self.x_discs - self.o_discs
+        self._update_frontier()
+        # The feature values before every move, restored by on_undo.
+        self._undo_stack = []
+
+    def _weighted_sum(self, bits):
+        weights = self.weights
+        total = 0.0
+        while bits:
+            low = bits & -bits
+            total += weights[low.bit_length() - 1]
+            bits ^= low
+        return total
+
+    def _update_frontier(self):
+        frontier = frontier_mask(self.x_bits, self.o_bits)
+        self.x_frontier = popcount(frontier & self.x_bits)
+        self.o_frontier = popcount(frontier & self.o_bits)
+
+    def _snapshot(self):
+        return (self.x_bits, self.o_bits, self.x_discs, self.o_discs, self.x_weighted, self.o_weighted,
+                self.x_frontier, self.o_frontier)
+
+    def on_move(self, color, sq, flips):
+        self._undo_stack.append(self._snapshot())
+        move_bit = 1 << sq
+        flipped = popcount(flips)
+        gained = self.weights[sq]
+        moved = self._weighted_sum(flips)
+        if color == X_PLAYER:
+            self.x_bits |= move_bit | flips
+            self.o_bits ^= flips
+            self.x_discs += 1 + flipped
+            self.o_discs -= flipped
+            self.x_weighted += gained + moved
+            self.o_weighted -= moved
+        else:
+            self.o_bits |= move_bit | flips
+            self.x_bits ^= flips
+            self.o_discs += 1 + flipped
+            self.x_discs -= flipped
+            self.o_weighted += gained + moved
+            self.x_weighted -= moved
+        self.empties -= 1
+        self._update_frontier()
+
+    def on_undo(self, color, sq, flips):
+        (self.x_bits, self.o_bits, self.x_discs, self.o_discs, self.x_weighted, self.o_weighted,
+         self.x_frontier, self.o_frontier) = self._undo_stack.pop()
+        self.empties += 1
+
+    def copy(self):
+        other = FeatureAccumulator.__new__(FeatureAccumulator)
+        other.__dict__.update(self.__dict__)
+        other._undo_stack = []
+        return other
+
+    def features(self, color):
+        """Returns the features from the point of view of 'color':
+        [my discs, opponent discs, my weighted sum, opponent weighted sum, my frontier, opponent frontier].
+        """
+        if color == X_PLAYER:
+            return [self.x_discs, self.o_discs, self.x_weighted, self.o_weighted, self.x_frontier, self.o_frontier]
+        return [self.o_discs, self.x_discs, self.o_weighted, self.x_weighted, self.o_frontier, self.x_frontier]
+
+    def edge_runs(self, color):
+        """Returns [my edge runs, opponent edge runs], see edge_runs."""
+        runs = edge_runs(self.x_bits, self.o_bits)
+        return runs if color == X_PLAYER else runs[::-1]
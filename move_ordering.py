@@ -0,0 +1,94 @@
+"""Move ordering for the alpha-beta search.
+
+Moves are tried in this order:
+1. The best move stored for the position (from the previous iteration, through the transposition table).
+2. Corners.
+3. The killer moves of the ply - quiet moves that caused a cutoff in a sibling node.
+4. The rest, by the history heuristic, and with the X-squares (diagonally next to a corner) last.
+"""
+from Reversi.consts import BOARD_COLS, BOARD_ROWS
+
+
+CORNERS = [[0, 0], [0, 7], [7, 0], [7, 7]]
+X_SQUARES = [[1, 1], [1, 6], [6, 1], [6, 6]]
+
+HASH_MOVE_SCORE = 1 << 40
+CORNER_SCORE = 1 << 35
+KILLER_SCORE = 1 << 30
+X_SQUARE_SCORE = -(1 << 30)
+
+# Killer tables are indexed by the game ply (number of moves played), which is never more than the number of squares.
+MAX_PLY = BOARD_COLS * BOARD_ROWS
+
+
+def static_scores():
+    """Returns the static ordering score of each square, indexed [x][y]."""
+    scores = [[0] * BOARD_ROWS for _ in range(BOARD_COLS)]
+    for x, y in CORNERS:
+        scores[x][y] = CORNER_SCORE
+    for x, y in X_SQUARES:
+        scores[x][y] = X_SQUARE_SCORE
+    return scores
+
+
+class MoveOrderer:
+
+    KILLERS_PER_PLY = 2
+
+    def __init__(self, use_killers=True, use_history=True, use_static=True):
+        """Initialize empty killer and history tables.
+
+        :param use_killers: Whether to order killer moves first.
+        :param use_history: Whether to order the remaining moves by the history heuristic.
+        :param use_static: Whether to put corners first and X-squares last.
+        """
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.static = static_scores() if use_static else [[0] * BOARD_ROWS for _ in range(BOARD_COLS)]
+        self.killers = [[] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * BOARD_ROWS for _ in range(BOARD_COLS)]
+
+    def new_search(self):
+        """Called before each new search: forgets the killers and ages the history scores."""
+        self.killers = [[] for _ in range(MAX_PLY + 1)]
+        for row in self.history:
+            for y in range(BOARD_ROWS):
+                row[y] >>= 1
+
+    def order(self, moves, ply, hash_move=None):
+        """Returns the moves sorted from the most to the least promising. Ties keep their original order.
+
+        :param moves: The possible moves, as returned by GameState.get_possible_moves.
+        :param ply: The number of moves played until the position.
+        :param hash_move: The best move stored for the position, or None.
+        """
+        killers = self.killers[ply] if self.use_killers else ()
+        static = self.static
+        history = self.history if self.use_history else None
+
+        def priority(move):
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            score = static[move[0]][move[1]]
+            if move in killers:
+                score += KILLER_SCORE - killers.index(move)
+            elif history is not None:
+                score += history[move[0]][move[1]]
+            return score
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def record_cutoff(self, move, ply, depth):
+        """Updates the killers and history with a move that caused a beta (or alpha) cutoff.
+
+        :param move: The move that caused the cutoff.
+        :param ply: The number of moves played until the position the move was played in.
+        :param depth: The remaining search depth at that position.
+        """
+        if self.use_killers:
+            killers = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[MoveOrderer.KILLERS_PER_PLY:]
+        if self.use_history:
+            self.history[move[0]][move[1]] += depth * depth
@@ -0,0 +1,272 @@
+"""Parallel alpha-beta searches on a persistent pool of worker processes: splitting the root moves, and Lazy-SMP.
+
+Threads cannot search in parallel because of the GIL, so the root moves are split between processes. The split follows
+young brothers wait: the first root move (the best one of the previous iteration) is searched alone, in this process,
+to get a good alpha. The other root moves are then searched by the workers, all at once. The best score proven so far
+is shared between the workers through a multiprocessing.Value: a worker starts each move with the current shared alpha,
+and raises it when it finds a better move. Each worker keeps its own search objects and transposition table for the
+whole game. When the results are late, a shared stop flag ends the searches of the workers that are still running, so
+that they do not take the CPU from the next search.
+
+Workers build their search with a factory, a module level function (so it can be sent to the workers) that gets the
+color of the searching player and a no_more_time function, and returns a tuple (MiniMaxWithAlphaBetaPruning, prepare),
+where prepare(state) is called on every root state before it is searched (e.g. to attach accumulators).
+
+Lazy-SMP (LazySMPSearch) does not split the work. This process searches the root as usual, while every worker searches
+the whole root too, half of them one depth deeper. All of them share a transposition.SharedTranspositionTable, so the
+workers fill it with results that this process then finds. Its factory gets the shared table as a third parameter.
+"""
+from __future__ import print_function, division
+import atexit
+import multiprocessing
+import os
+import time
+from utils import INFINITY, NULL_WINDOW, search_root_moves
+from transposition import SharedTranspositionTable
+
+
+# Extra time given to the workers' results after the deadline, since the workers only check the time every node.
+RESULT_GRACE = 0.05
+# A deadline for searches without a time limit.
+NO_DEADLINE = float('inf')
+
+# The search objects of a worker process, set by _init_worker.
+_worker = None
+
+
+class _Worker:
+
+    def __init__(self, factory, color, shared_alpha=None, stop=None, transposition_table=None):
+        self.deadline = NO_DEADLINE
+        self.shared_alpha = shared_alpha
+        self.stop = stop
+        if transposition_table is None:
+            self.alpha_beta, self.prepare = factory(color, self.no_more_time)
+        else:
+            self.alpha_beta, self.prepare = factory(color, self.no_more_time, transposition_table)
+
+    def no_more_time(self):
+        return time.time() >= self.deadline or (self.stop is not None and self.stop.value)
+
+
+def _init_worker(factory, color, shared_alpha, stop):
+    global _worker
+    _worker = _Worker(factory, color, shared_alpha, stop)
+
+
+def _init_lazy_smp_worker(factory, color, stop, transposition_table):
+    global _worker
+    _worker = _Worker(factory, color, stop=stop, transposition_table=transposition_table)
+
+
+def _search_move(state, move, depth, beta, deadline):
+    # Searches a root move in a worker. Returns (score, move, the alpha it was searched with, whether the search
+    # completed, nodes searched).
+    worker = _worker
+    worker.deadline = deadline
+    alpha_beta = worker.alpha_beta
+    shared_alpha = worker.shared_alpha
+    nodes = alpha_beta.nodes
+    alpha = shared_alpha.value
+    worker.prepare(state)
+    state.make_move(move[0], move[1])
+    if alpha_beta.pvs:
+        score, _ = alpha_beta.search(state, depth - 1, alpha, alpha + NULL_WINDOW, False)
+        if alpha < score < beta:
+            # The re-search may start from a higher alpha, which is then the one its score is a bound of.
+            alpha = max(alpha, shared_alpha.value)
+            score, _ = alpha_beta.search(state, depth - 1, alpha, beta, False)
+    else:
+        score, _ = alpha_beta.search(state, depth - 1, alpha, beta, False)
+    completed = not worker.no_more_time()
+    if completed and score > alpha:
+        with shared_alpha.get_lock():
+            if score > shared_alpha.value:
+                shared_alpha.value = score
+    return score, move, alpha, completed, alpha_beta.nodes - nodes
+
+
+class ParallelRootSearch:
+
+    def __init__(self, processes, factory, color):
+        """Initialize the search. The pool is started on the first search, so the object can be pickled until then.
+
+        :param processes: The number of worker processes.
+        :param factory: The factory the workers build their search with, see the module documentation.
+        :param color: The color of the searching player.
+        """
+        self.processes = processes
+        self.factory = factory
+        self.color = color
+        self.pool = None
+        self.shared_alpha = None
+        self.stop = None
+        # Nodes searched by the workers, for statistics.
+        self.nodes = 0
+
+    def start(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', -INFINITY)
+            self.stop = multiprocessing.RawValue('b', 0)
+            self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                             initargs=(self.factory, self.color, self.shared_alpha, self.stop))
+            # Stops the workers before the interpreter tears down the pool's pipes.
+            atexit.register(self.close)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['shared_alpha'] = None
+        state['stop'] = None
+        return state
+
+    def search_root(self, alpha_beta, state, depth, moves, alpha, beta, deadline):
+        """Searches the root moves, like IterativeDeepening.search_root: the first one with alpha_beta in this process,
+        and the rest in the workers.
+
+        :param alpha_beta: The MiniMaxWithAlphaBetaPruning of this process.
+        :param deadline: The time.time() by which the results are needed, or NO_DEADLINE.
+        :return: A tuple: (the fail-soft score, the best move, a list of (score, move) of the searched moves). If the
+                 time ran out, the list is None, and the score and the move are the best ones proven, or None if the
+                 first move was not searched to the end.
+        """
+        self.start()
+        self.stop.value = 0
+        first = moves[0]
+        state.make_move(first[0], first[1])
+        best_score, _ = alpha_beta.search(state, depth - 1, alpha, beta, False)
+        state.undo_move()
+        if time.time() >= deadline or alpha_beta.no_more_time():
+            return None, None, None
+        best_move = first
+        completed = [(best_score, first)]
+        if best_score >= beta or len(moves) == 1:
+            return best_score, best_move, completed
+        self.shared_alpha.value = max(alpha, best_score)
+        root = state.copy()
+        root.accumulators = {}
+        pending = [self.pool.apply_async(_search_move, (root, move, depth, beta, deadline)) for move in moves[1:]]
+        timed_out = False
+        for result in pending:
+            timeout = None
+            if deadline != NO_DEADLINE and not self.stop.value:
+                timeout = max(0.0, deadline - time.time()) + RESULT_GRACE
+            try:
+                score, move, move_alpha, move_completed, nodes = result.get(timeout)
+            except multiprocessing.TimeoutError:
+                # The workers stop within a node, and the rest of the moves are drained, so that no search keeps
+                # running into the next one.
+                self.stop.value = 1
+                score, move, move_alpha, move_completed, nodes = result.get()
+            self.nodes += nodes
+            if not move_completed:
+                timed_out = True
+                continue
+            completed.append((score, move))
+            # A score not above the alpha it was searched with is only an upper bound.
+            if score > best_score and score > move_alpha:
+                best_score, best_move = score, move
+        return best_score, best_move, None if timed_out else completed
+
+
+def _search_helper(state, depth, alpha, beta, deadline):
+    # Searches the root in a Lazy-SMP worker. Returns (the worker's pid, nodes searched, the worker's shared table
+    # statistics).
+    worker = _worker
+    worker.deadline = deadline
+    alpha_beta = worker.alpha_beta
+    nodes = alpha_beta.nodes
+    worker.prepare(state)
+    alpha_beta.search(state, depth, alpha, beta, True)
+    return os.getpid(), alpha_beta.nodes - nodes, alpha_beta.transposition_table.stats()
+
+
+class LazySMPSearch:
+
+    def __init__(self, processes, factory, color, tt_size_mb=16):
+        """Initialize the search. The pool and the shared table are created on the first search, so the object can be
+        pickled until then.
+
+        :param processes: The number of worker processes.
+        :param factory: The factory the workers build their search with, see the module documentation.
+        :param color: The color of the searching player.
+        :param tt_size_mb: Memory cap of the shared transposition table in megabytes.
+        """
+        self.processes = processes
+        self.factory = factory
+        self.color = color
+        self.tt_size_mb = tt_size_mb
+        self.pool = None
+        self.table = None
+        self.stop = None
+        self.root_key = None
+        # Nodes searched by the workers, and the last shared table statistics of each worker by pid.
+        self.nodes = 0
+        self.worker_stats = {}
+
+    def start(self):
+        if self.pool is None:
+            self.table = SharedTranspositionTable(self.tt_size_mb)
+            self.stop = multiprocessing.RawValue('b', 0)
+            self.pool = multiprocessing.Pool(self.processes, initializer=_init_lazy_smp_worker,
+                                             initargs=(self.factory, self.color, self.stop, self.table))
+            # Stops the workers before the interpreter tears down the pool's pipes, and frees the shared table.
+            atexit.register(self.close)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.table.close(unlink=True)
+            self.table = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['table'] = None
+        state['stop'] = None
+        return state
+
+    def stats(self):
+        """Returns the shared table statistics of every process that searched with it: {'main' or worker pid: stats},
+        see SharedTranspositionTable.stats.
+        """
+        stats = dict(self.worker_stats)
+        if self.table is not None:
+            stats['main'] = self.table.stats()
+        return stats
+
+    def search_root(self, alpha_beta, state, depth, moves, alpha, beta, deadline):
+        """Searches the root moves, like IterativeDeepening.search_root, while the workers search the root with the
+        shared table. From the first search on, alpha_beta searches with the shared table instead of its own.
+
+        :param alpha_beta: The MiniMaxWithAlphaBetaPruning of this process.
+        :param deadline: The time.time() by which the results are needed, or NO_DEADLINE.
+        :return: A tuple: (the fail-soft score, the best move, a list of (score, move) of the completed moves).
+        """
+        self.start()
+        alpha_beta.transposition_table = self.table
+        if state.key != self.root_key:
+            # A new move.
+            self.root_key = state.key
+            self.table.new_search()
+        self.stop.value = 0
+        root = state.copy()
+        root.accumulators = {}
+        helpers = [self.pool.apply_async(_search_helper, (root, depth + (i + 1) % 2, alpha, beta, deadline))
+                   for i in range(self.processes)]
+        result = search_root_moves(alpha_beta, state, depth, moves, alpha, beta, alpha_beta.no_more_time)
+        # The workers stop within a node, and must be done before the next search resets the flag.
+        self.stop.value = 1
+        for helper in helpers:
+            pid, nodes, stats = helper.get()
+            self.nodes += nodes
+            self.worker_stats[pid] = stats
+        return result
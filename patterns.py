@@ -0,0 +1,223 @@
+"""Pattern-table evaluation.
+
+The board is covered by pattern instances: the 4 edges, the 2x5 blocks at each corner (in both orientations), the 3x3
+corners and the diagonals of length 4 to 8. Each instance is read as a base-3 number (0 - empty, 1 - X, 2 - O, the
+first square being the least significant digit), which indexes the weight table of its pattern. All the instances of a
+pattern are symmetric to each other, so they share one table. There is a table per game phase, and the score is the sum
+of the weights of all the instances, from X's point of view.
+
+Usage: python -m patterns [weights file] - writes the default weights to the file.
+"""
+from __future__ import print_function, division
+import os
+import struct
+import sys
+import numpy as np
+from Reversi.board import transform_square, SYMMETRIES
+from Reversi.consts import X_PLAYER, O_PLAYER, BOARD_COLS, BOARD_ROWS
+
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'patterns.bin')
+WEIGHTS_MAGIC = b'RVPW'
+WEIGHTS_VERSION = 1
+# Weights are stored as int16 multiples of 1 / WEIGHT_SCALE.
+WEIGHT_SCALE = 64
+# Number of game phases, by the number of discs on the board.
+PHASES = 4
+
+# name -> the squares of one instance, in digit order. The other instances are its symmetric images.
+PATTERNS = (
+    ('edge', [(0, y) for y in range(8)]),
+    ('corner_2x5', [(x, y) for x in range(2) for y in range(5)]),
+    ('corner_3x3', [(x, y) for x in range(3) for y in range(3)]),
+    ('diagonal_8', [(i, i) for i in range(8)]),
+    ('diagonal_7', [(i, i + 1) for i in range(7)]),
+    ('diagonal_6', [(i, i + 2) for i in range(6)]),
+    ('diagonal_5', [(i, i + 3) for i in range(5)]),
+    ('diagonal_4', [(i, i + 4) for i in range(4)]),
+)
+
+DIGITS = {X_PLAYER: 1, O_PLAYER: 2}
+
+
+def _build_instances():
+    # Returns a list of (pattern number, squares) of all the distinct instances.
+    instances = []
+    for pattern, (_, squares) in enumerate(PATTERNS):
+        seen = set()
+        for transform in SYMMETRIES:
+            instance = [8 * x + y for x, y in (transform_square(x, y, transform) for x, y in squares)]
+            if frozenset(instance) not in seen:
+                seen.add(frozenset(instance))
+                instances.append((pattern, instance))
+    return instances
+
+
+INSTANCES = _build_instances()
+TABLE_SIZES = [3 ** len(squares) for _, squares in PATTERNS]
+# Offset of each pattern's table in the flat weights array of a phase.
+TABLE_OFFSETS = [sum(TABLE_SIZES[:pattern]) for pattern in range(len(PATTERNS))]
+FLAT_SIZE = sum(TABLE_SIZES)
+# SQUARE_DIGITS[sq] lists (instance number, 3 ** digit position) for every instance containing square sq.
+SQUARE_DIGITS = [[(i, 3 ** instance.index(sq)) for i, (_, instance) in enumerate(INSTANCES) if sq in instance]
+                 for sq in range(BOARD_COLS * BOARD_ROWS)]
+
+
+def get_phase(x_bits, o_bits):
+    discs = bin(x_bits | o_bits).count('1')
+    return min(PHASES - 1, (discs - 4) * PHASES // (BOARD_COLS * BOARD_ROWS - 3))
+
+
+def compute_indices(x_bits, o_bits):
+    """Returns the flat weights index (pattern offset + base-3 number) of every instance, computed from scratch."""
+    indices = []
+    for pattern, instance in INSTANCES:
+        index = 0
+        power = 1
+        for sq in instance:
+            bit = 1 << sq
+            if x_bits & bit:
+                index += power
+            elif o_bits & bit:
+                index += 2 * power
+            power *= 3
+        indices.append(TABLE_OFFSETS[pattern] + index)
+    return indices
+
+
+class PatternIndexer:
+    """Keeps the pattern indices of a GameState up to date on every move. Attach it with
+    state.attach(PatternIndexer.NAME, PatternIndexer(state)).
+    """
+
+    NAME = 'patterns'
+
+    def __init__(self, state):
+        self.indices = compute_indices(state.x_bits, state.o_bits)
+
+    def on_move(self, color, sq, flips):
+        indices = self.indices
+        digit = DIGITS[color]
+        for i, power in SQUARE_DIGITS[sq]:
+            indices[i] += digit * power
+        # A flip turns digit 3 - digit into digit.
+        flip_digit = 2 * digit - 3
+        while flips:
+            low = flips & -flips
+            for i, power in SQUARE_DIGITS[low.bit_length() - 1]:
+                indices[i] += flip_digit * power
+            flips ^= low
+
+    def on_undo(self, color, sq, flips):
+        indices = self.indices
+        digit = DIGITS[color]
+        for i, power in SQUARE_DIGITS[sq]:
+            indices[i] -= digit * power
+        flip_digit = 2 * digit - 3
+        while flips:
+            low = flips & -flips
+            for i, power in SQUARE_DIGITS[low.bit_length() - 1]:
+                indices[i] -= flip_digit * power
+            flips ^= low
+
+    def copy(self):
+        other = PatternIndexer.__new__(PatternIndexer)
+        other.indices = list(self.indices)
+        return other
+
+
+def default_square_values():
+    """The value of a disc on each square, indexed [x][y]: the better player's scoreMat plus SCORE_ONE_TILE. The
+    scoreMat leaves the squares next to the (7, 7) corner and two of the squares next to the (0, 7) and (7, 0) corners at
+    0; here all the squares next to a corner get the same value, since the weights of symmetric instances are shared.
+    """
+    corner, perimeter_corner, border, perimeter_border, one_tile = 10, -2, 3, -1, 1.5
+    values = np.zeros((BOARD_COLS, BOARD_ROWS))
+    for i in [1, 6]:
+        for j in [2, 3, 4, 5]:
+            values[i][j] = values[j][i] = perimeter_border
+    for i in [0, 7]:
+        for j in [2, 3, 4, 5]:
+            values[i][j] = values[j][i] = border
+    for i in [0, 1, 6, 7]:
+        for j in [0, 1, 6, 7]:
+            values[i][j] = corner if i in [0, 7] and j in [0, 7] else perimeter_corner
+    return values + one_tile
+
+
+def default_weights():
+    """Builds weights that sum to the better player's weighted disc count: every square's value is split evenly between
+    the instances covering it. The weights are the same in all the phases.
+
+    :return: A float array of shape (PHASES, FLAT_SIZE).
+    """
+    values = default_square_values().ravel()
+    coverage = [len(SQUARE_DIGITS[sq]) for sq in range(BOARD_COLS * BOARD_ROWS)]
+    flat = np.zeros(FLAT_SIZE)
+    for pattern, (_, squares) in enumerate(PATTERNS):
+        # Any instance will do, since all of them are symmetric and the square values are symmetric too.
+        instance = next(instance for p, instance in INSTANCES if p == pattern)
+        table = np.zeros(TABLE_SIZES[pattern])
+        digits = np.arange(TABLE_SIZES[pattern])
+        for sq in instance:
+            digit = digits % 3
+            share = values[sq] / coverage[sq]
+            table += np.where(digit == 1, share, np.where(digit == 2, -share, 0))
+            digits //= 3
+        flat[TABLE_OFFSETS[pattern]:TABLE_OFFSETS[pattern] + TABLE_SIZES[pattern]] = table
+    return np.tile(flat, (PHASES, 1))
+
+
+def save_weights(weights, path=WEIGHTS_PATH):
+    """Writes weights of shape (PHASES, FLAT_SIZE) to a binary file: a header and then the int16 tables."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'wb') as weights_file:
+        weights_file.write(struct.pack('<4sHHHI', WEIGHTS_MAGIC, WEIGHTS_VERSION, PHASES, WEIGHT_SCALE, FLAT_SIZE))
+        weights_file.write(np.round(weights * WEIGHT_SCALE).astype('<i2').tobytes())
+
+
+def load_weights(path=WEIGHTS_PATH):
+    """Reads weights written by save_weights.
+
+    :return: A float array of shape (PHASES, FLAT_SIZE).
+    :raises ValueError: If the file is not a weights file of the current pattern set.
+    """
+    header_size = struct.calcsize('<4sHHHI')
+    with open(path, 'rb') as weights_file:
+        data = weights_file.read()
+    magic, version, phases, scale, flat_size = struct.unpack('<4sHHHI', data[:header_size])
+    if magic != WEIGHTS_MAGIC or version != WEIGHTS_VERSION or phases != PHASES or flat_size != FLAT_SIZE:
+        raise ValueError('{} is not a pattern weights file of this version'.format(path))
+    tables = np.frombuffer(data, dtype='<i2', offset=header_size, count=phases * flat_size)
+    return tables.reshape(phases, flat_size) / float(scale)
+
+
+class PatternEvaluator:
+
+    def __init__(self, weights_path=WEIGHTS_PATH):
+        """Loads the weights, falling back to default_weights if the file does not exist.
+
+        :param weights_path: A file written by save_weights, or None to use the default weights.
+        """
+        weights = None
+        if weights_path is not None:
+            try:
+                weights = load_weights(weights_path)
+            except (IOError, OSError):
+                pass
+        self.weights = weights if weights is not None else default_weights()
+
+    def evaluate(self, state, color):
+        """Returns the pattern score of the state from the point of view of 'color'. Uses the state's PatternIndexer
+        if one is attached, and computes the indices from scratch otherwise.
+        """
+        indexer = state.accumulators.get(PatternIndexer.NAME)
+        indices = indexer.indices if indexer is not None else compute_indices(state.x_bits, state.o_bits)
+        score = self.weights[get_phase(state.x_bits, state.o_bits)].take(indices).sum()
+        return score if color == X_PLAYER else -score
+
+
+if __name__ == '__main__':
+    save_weights(default_weights(), *sys.argv[1:])
@@ -4,13 +4,24 @@
 #===============================================================================
 
 import abstract
+import sys
 from utils import INFINITY, run_with_limited_time, ExceededTimeError, MAX_DEPTH
 from Reversi.consts import EM, OPPONENT_COLOR, BOARD_COLS, BOARD_ROWS
 import time
 import copy
 from collections import defaultdict
-from utils import MiniMaxWithAlphaBetaPruning
+from utils import MiniMaxWithAlphaBetaPruning, IterativeDeepening
+from time_manager import TimeManager
+from ponder import Ponderer
+from probcut import MultiProbCut
+from reductions import LateMoveReductions
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from eval_cache import EvalCache
+from endgame import EndgameSolver
 import numpy as np
+from evaluation import board_array, weighted_sums, frontier_counts, edge_run_counts, decay_table
+from features import FeatureAccumulator
 
 
 #===============================================================================
@@ -25,22 +36,50 @@ class Player(abstract.AbstractPlayer):
     SCORE_PERIMETER_BORDER = -1 # -15--1
     SCORE_ONE_TILE = 1.5 # 1-30
     SCORE_FRONTIER = -1 # -10--1
-    DECAY = 1
     DECAY_INITIAL = 1.2
     DECAY_FACTOR = 250 # 250 outscored 120,200,300,1000
+    DECAY_TABLE = decay_table(DECAY_INITIAL, SCORE_ONE_TILE, DECAY_FACTOR)
+    TT_SIZE_MB = 16
+    EVAL_CACHE_ENTRIES = 1 << 16
+    ENDGAME_EMPTIES = 12 # positions with at most this many empty squares are solved exactly
+    ENDGAME_TIME_SHARE = 0.5 # of the move time, before the solver gives up and the heuristic search runs instead
+    USE_PVS = True # principal variation search, see MiniMaxWithAlphaBetaPruning
+    ASPIRATION_WINDOW = 8.0 # around the score of 2 iterations before, 0 for full windows (see benchmarks/pvs.py)
+    PONDER = None # search on the opponent's time: None - don't, 'predicted' or 'all' - which replies (see ponder.py)
+    USE_PROBCUT = False # Multi-ProbCut forward pruning, with the models fitted by python -m probcut (see probcut.py)
+    USE_LMR = False # late-move reductions, see reductions.py and benchmarks/lmr.py
 
 
     def __init__(self, setup_time, player_color, time_per_k_turns, k):
         abstract.AbstractPlayer.__init__(self, setup_time, player_color, time_per_k_turns, k)
-        self.clock = time.time()
-
-        # We are simply providing (remaining time / remaining turns) for each turn in round.
-        # Taking a spare time of 0.05 seconds.
-        self.turns_remaining_in_round = self.k
-        self.time_remaining_in_round = self.time_per_k_turns
-        self.time_for_current_move = self.time_remaining_in_round / self.turns_remaining_in_round - 0.05
-        alphaBeta = MiniMaxWithAlphaBetaPruning(self.utilityBetter,player_color,self.no_more_time,False)
+
+        # The time manager gives every move its share of the time left in the round, see time_manager.py.
+        self.time_manager = TimeManager(self.time_per_k_turns, self.k)
+        # The pondering thread may hold the GIL for a switch interval after get_move returns.
+        self.time_manager.calibrate(sys.getswitchinterval() if Player.PONDER is not None else 0.0)
+        self.transposition_table = TranspositionTable(Player.TT_SIZE_MB)
+        self.move_orderer = MoveOrderer()
+        # The utility is a pure function of the position, so its values stay valid for the whole game.
+        self.eval_cache = EvalCache(Player.EVAL_CACHE_ENTRIES)
+        self.endgame_solver = EndgameSolver()
+        self.probcut = MultiProbCut() if Player.USE_PROBCUT else False
+        self.late_move_reductions = LateMoveReductions() if Player.USE_LMR else None
+        alphaBeta = MiniMaxWithAlphaBetaPruning(self.utilityBetter,player_color,self.no_more_time,self.probcut,
+                                                self.transposition_table,self.move_orderer,
+                                                eval_cache=self.eval_cache,pvs=Player.USE_PVS,
+                                                late_move_reductions=self.late_move_reductions)
         self.search = alphaBeta.search
+        self.deepening = IterativeDeepening(alphaBeta,self.no_more_time,self.time_left,Player.ASPIRATION_WINDOW)
+        self.ponderer = None
+        if Player.PONDER is not None:
+            # The pondering search shares the tables of the player's search, which never runs at the same time.
+            self.ponderer = Ponderer(Player.PONDER)
+            ponderSearch = MiniMaxWithAlphaBetaPruning(self.utilityBetter,player_color,self.ponderer.no_more_time,
+                                                       self.probcut,self.transposition_table,self.move_orderer,
+                                                       eval_cache=self.eval_cache,pvs=Player.USE_PVS,
+                                                       late_move_reductions=self.late_move_reductions)
+            self.ponderer.deepening = IterativeDeepening(ponderSearch,self.ponderer.no_more_time,
+                                                         self.ponderer.time_left,Player.ASPIRATION_WINDOW)
 
         # divide the board into 5 categories and score them from best to worst
         cells1Type = [2, 3, 4, 5]
@@ -69,23 +108,39 @@ class Player(abstract.AbstractPlayer):
 
 
     def get_move(self, game_state, possible_moves):
-        self.clock = time.time()
-        self.time_for_current_move = self.time_remaining_in_round / self.turns_remaining_in_round - 0.05
-        depth = 2
-        bestMove = None
-        while not(self.no_more_time()) and depth < MAX_DEPTH:
-            # print(" AB-The current depth is:",depth) # TODO remove
-            score,currMove = self.search(game_state,depth,-INFINITY,INFINITY,True)
-            if not(self.no_more_time()):
-                bestMove = currMove
-            # print("At ",depth, "depth best move is:", bestMove,"with score of:",score) # TODO remove
+        self.time_manager.start_move(game_state.empty_count())
+        pondered = self.ponderer.stop(game_state.key) if self.ponderer is not None else None
+        move = self.chooseMove(game_state, possible_moves, pondered)
+        # Pondering is not worth it when the endgame solver will take over after the opponent's reply.
+        if self.ponderer is not None and game_state.empty_count() > Player.ENDGAME_EMPTIES + 2:
+            self.ponderer.start(game_state, move, self.deepening.pv)
+        self.time_manager.end_move()
+        return move
+
+    def chooseMove(self, game_state, possible_moves, resume=None):
+    # searches for the best move, in the time given by the time manager, continuing from the given result (pondered)
+    # or from the last search
+        self.transposition_table.new_search()
+        self.move_orderer.new_search()
+        # The features are then kept up to date by the search's make_move / undo_move.
+        game_state.attach(FeatureAccumulator.NAME, FeatureAccumulator(game_state, self.scoreMat))
+        if game_state.empty_count() <= Player.ENDGAME_EMPTIES:
+            solved = self.endgame_solver.best_move(game_state, self.no_more_endgame_time)
+            if solved is not None:
+                return solved[1]
+        if resume is None:
+            # The last search went through this position if the opponent played the reply it predicted.
+            resume = self.deepening.carry_over(game_state)
+        return self.deepening.run(game_state, possible_moves, resume=resume)
 
-            depth += 1
+    def no_more_time(self):
+        return self.time_manager.no_more_time()
 
-        return bestMove
+    def time_left(self):
+        return self.time_manager.time_left()
 
-    def no_more_time(self):
-        return (time.time() - self.clock) >= self.time_for_current_move
+    def no_more_endgame_time(self):
+        return self.time_manager.no_more_time_for(Player.ENDGAME_TIME_SHARE)
 
     def __repr__(self):
         return '{} {}'.format(abstract.AbstractPlayer.__repr__(self), 'alpha_beta')
@@ -96,7 +151,7 @@ class Player(abstract.AbstractPlayer):
 
     #*****      simple heuristic        *****#
     def utilitySimple(self, state):
-        if len(state.get_possible_moves()) == 0: #TODO trying something new this heuristic looks wrong to me
+        if state.mobility() == 0: #TODO trying something new this heuristic looks wrong to me
             return INFINITY if state.curr_player != self.color else -INFINITY
 
         my_u = 0
@@ -122,20 +177,24 @@ class Player(abstract.AbstractPlayer):
 
     # *****      better heuristic        *****#
     def utilityBetter(self, state, verbose=False):
-        if len(state.get_possible_moves()) == 0:
+        if state.mobility() == 0:
             return INFINITY if state.curr_player != self.color else -INFINITY
 
-        my_u = 0
-        op_u = 0
-        (my_u, op_u) = np.array(self.scoreOfTiles(state)) \
-                       + Player.SCORE_FRONTIER * np.array(self.countNumOfEmptyAroundTile(state)) \
-                       + np.array(self.countUnemptyColRow(state))
+        features = state.accumulators.get(FeatureAccumulator.NAME)
+        if features is not None and not verbose:
+            return self.utilityFeatures(features)
+        board = board_array(state, self.color)
+        (my_tiles, op_tiles) = self.scoreOfTiles(board)
+        (my_frontier, op_frontier) = self.countNumOfEmptyAroundTile(board)
+        (my_edges, op_edges) = self.countUnemptyColRow(board)
+        my_u = my_tiles + Player.SCORE_FRONTIER * my_frontier + my_edges
+        op_u = op_tiles + Player.SCORE_FRONTIER * op_frontier + op_edges
         if verbose:
-            (my_u1, op_u1) = self.scoreOfTiles(state)
+            (my_u1, op_u1) = self.scoreOfTiles(board)
             print("our score for tiles =", my_u1, "enemy score for tiles:", op_u1)
-            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(state)
+            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(board)
             print("our empty around =", my_u1, "enemy empty around:", op_u1)
-            (my_u1, op_u1) = self.countUnemptyColRow(state)
+            (my_u1, op_u1) = self.countUnemptyColRow(board)
             print("our row-col =", my_u1, "enemy rowcol:", op_u1)
             print("Total score = ", my_u - op_u)
 
@@ -150,75 +209,28 @@ class Player(abstract.AbstractPlayer):
         else:"""
         return my_u - op_u
 
+    def utilityFeatures(self, features):
+    # utilityBetter of a position without moves checks, read from its FeatureAccumulator
+        my_tiles, op_tiles, my_weights, op_weights, my_frontier, op_frontier = features.features(self.color)
+        my_edges, op_edges = features.edge_runs(self.color)
+        decay = Player.DECAY_TABLE[my_tiles + op_tiles]
+        my_u = decay*my_weights + Player.SCORE_ONE_TILE*my_tiles + Player.SCORE_FRONTIER*my_frontier + my_edges
+        op_u = decay*op_weights + Player.SCORE_ONE_TILE*op_tiles + Player.SCORE_FRONTIER*op_frontier + op_edges
+        return my_u - op_u
 
-    def scoreOfTiles(self, state):
+    def scoreOfTiles(self, board):
     # Uses the initial scoring mat to evaluate the state
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += Player.DECAY * self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += Player.DECAY * self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-            Player.DECAY = Player.DECAY_INITIAL - (my_u + op_u) / Player.DECAY_FACTOR  # CHANGE
+    # The scoreMat weights are multiplied by the decay of the number of discs on the board
+        my_weights, op_weights, my_tiles, op_tiles = weighted_sums(board, self.scoreMat)
+        decay = Player.DECAY_TABLE[my_tiles + op_tiles]
+        my_u = decay*my_weights + Player.SCORE_ONE_TILE*my_tiles
+        op_u = decay*op_weights + Player.SCORE_ONE_TILE*op_tiles
         return [my_u,op_u]
 
+    def countNumOfEmptyAroundTile(self, board):
+    # Return the number of tiles with an empty tile around them (frontier tiles)
+        return frontier_counts(board)
 
-    def countNumOfEmptyAroundTile(self, state):
-    # Return the number of empty tiles
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += 1 if self.emptyAroundTiles(state,x,y) else 0
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += 1 if self.emptyAroundTiles(state,x,y) else 0
-        return [my_u,op_u]
-
-
-
-    def isOnBoard(self, x, y):
-    # Returns True if the coordinates are located on the board.
-        return x >= 0 and x <= 7 and y >= 0 and y <=7
-
-    def isEmptyTile(self,state,x,y):
-    # Returns True if the coordinates are located on the board and the tile is empty
-        return self.isOnBoard(x,y) and state.board[x][y] == EM
-
-    def emptyAroundTiles(self,state,x,y):
-    # Sum the legal empty tiles around a given tile
-        for i in [-1,0,1]:
-            for j in [-1,0,1]:
-                if self.isEmptyTile(state, x - i, y - j):
-                    return True
-        return False
-
-    def countUnemptyColRow(self,state):
-    # gives a score for successive tiles at the same color
-        dic = {self.color : 0, OPPONENT_COLOR[self.color] : 0 , EM : 0}
-        # iterate over first row
-        i = j = 0
-        currColor = state.board[i][j]
-        while i < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i += 1
-        # iterate over first col
-        i = j = 0
-        currColor = state.board[i][j]
-        while j < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j += 1
-        # iterate over last row
-        i = j = 7
-        currColor = state.board[i][j]
-        while  i >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i -= 1
-        # iterate over last col
-        i = j = 7
-        currColor = state.board[i][j]
-        while j >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j -= 1
-
-        return [dic[self.color],dic[OPPONENT_COLOR[self.color]]]
\ No newline at end of file
+    def countUnemptyColRow(self,board):
+    # gives a score for successive tiles at the same color along the edges
+        return edge_run_counts(board)
@@ -7,9 +7,9 @@ import abstract
 from utils import INFINITY, run_with_limited_time, ExceededTimeError, Book
 from Reversi.consts import EM, OPPONENT_COLOR, BOARD_COLS, BOARD_ROWS
 import time
-import copy
 import numpy as np
 from collections import defaultdict
+from evaluation import children_boards, weighted_sums, frontier_counts, edge_run_counts
 
 
 
@@ -95,18 +95,11 @@ class Player(abstract.AbstractPlayer):
                 self.last_board[move_by_book[0]][move_by_book[1]] = Player.OCCUPIED
                 ### End Opening Book ###
                 return move_by_book
-        best_move = possible_moves[0]
-        next_state = copy.deepcopy(game_state)
-        next_state.perform_move(best_move[0], best_move[1])
-        # Choosing an arbitrary move
-        # Get the best move according the utility function
-        for move in possible_moves:
-            new_state = copy.deepcopy(game_state)
-            new_state.perform_move(move[0], move[1])
-            # print("###DEBUG: move x=", move[0]," y=",move[1])
-            if self.utility(new_state,False) > self.utility(next_state): #TODO set variable for self.utility(next_state)
-                next_state = new_state
-                best_move = move
+        # Get the best move according the utility function, evaluating all the moves at once.
+        # argmax returns the first best move.
+        boards, no_moves = children_boards(game_state, self.color, possible_moves)
+        scores = self.batch_utility(boards, OPPONENT_COLOR[game_state.curr_player], no_moves)
+        best_move = possible_moves[int(np.argmax(scores))]
 
         if self.turns_remaining_in_round == 1:
             self.turns_remaining_in_round = self.k
@@ -114,7 +107,6 @@ class Player(abstract.AbstractPlayer):
         else:
             self.turns_remaining_in_round -= 1
             self.time_remaining_in_round -= (time.time() - self.clock)
-        self.utility(next_state,False)
 
         ### For Opening Book ###
         self.moves_played += str(best_move[0])
@@ -124,7 +116,7 @@ class Player(abstract.AbstractPlayer):
         return best_move
 
     def utility(self, state, verbose = False):
-        if len(state.get_possible_moves()) == 0:
+        if state.mobility() == 0:
             return INFINITY if state.curr_player != self.color else -INFINITY
 
         my_u = 0
@@ -152,6 +144,15 @@ class Player(abstract.AbstractPlayer):
         else:"""
         return my_u - op_u
 
+    def batch_utility(self, boards, curr_player, no_moves):
+        # The utility of a stack of boards viewed by this player (see evaluation.children_boards).
+        my_weights, op_weights, my_tiles, op_tiles = weighted_sums(boards, self.scoreMat)
+        my_frontier, op_frontier = frontier_counts(boards)
+        my_edges, op_edges = edge_run_counts(boards)
+        my_u = my_weights + Player.SCORE_ONE_TILE * my_tiles + Player.SCORE_FRONTIER * my_frontier + my_edges
+        op_u = op_weights + Player.SCORE_ONE_TILE * op_tiles + Player.SCORE_FRONTIER * op_frontier + op_edges
+        return np.where(no_moves, INFINITY if curr_player != self.color else -INFINITY, my_u - op_u)
+
     def selective_deepening_criterion(self, state):
         # Simple player does not selectively deepen into certain nodes.
         return False
@@ -10,6 +10,7 @@ import copy
 from collections import defaultdict
 from utils import MiniMaxWithAlphaBetaPruning
 import numpy as np
+from evaluation import board_array, weighted_sums, frontier_counts, edge_run_counts, decay_table
 import random
 
 
@@ -25,9 +26,9 @@ class Player(abstract.AbstractPlayer):
                 "SCORE_PERIMETER_BORDER":random.choice(range(-15,-1)),\
                 "SCORE_ONE_TILE":random.choice(range(2,30)),\
                 "SCORE_FRONTIER":random.choice(range(-10,-1))}
-    DECAY = 1
     DECAY_INITIAL = 1.2
     DECAY_FACTOR = 250 # 250 outscored 120,200,300,1000
+    DECAY_TABLE = decay_table(DECAY_INITIAL, param["SCORE_ONE_TILE"], DECAY_FACTOR)
 
 
 
@@ -55,18 +56,18 @@ class Player(abstract.AbstractPlayer):
         self.scoreMat = np.zeros((8, 8))
         for i in cells2TypeA:
             for j in cells2TypeB:
-                self.scoreMat[i][j] = Player.SCORE_PERIMETER_BORDER
-                self.scoreMat[j][i] = Player.SCORE_PERIMETER_BORDER
+                self.scoreMat[i][j] = Player.param["SCORE_PERIMETER_BORDER"]
+                self.scoreMat[j][i] = Player.param["SCORE_PERIMETER_BORDER"]
         for i in cells3TypeA:
             for j in cells3TypeB:
-                self.scoreMat[i][j] = Player.SCORE_BORDER
-                self.scoreMat[j][i] = Player.SCORE_BORDER
+                self.scoreMat[i][j] = Player.param["SCORE_BORDER"]
+                self.scoreMat[j][i] = Player.param["SCORE_BORDER"]
         for i in cells4Type:
             for j in cells4Type:
-                self.scoreMat[i][j] = Player.SCORE_PERIMETER_CORNER
+                self.scoreMat[i][j] = Player.param["SCORE_PERIMETER_CORNER"]
         for i in cells5Type:
             for j in cells5Type:
-                self.scoreMat[i][j] = Player.SCORE_CORNER
+                self.scoreMat[i][j] = Player.param["SCORE_CORNER"]
 
     def get_move(self, game_state, possible_moves):
         self.clock = time.time()
@@ -92,7 +93,7 @@ class Player(abstract.AbstractPlayer):
 
     # *****      simple heuristic        *****#
     def utilitySimple(self, state):
-        if len(state.get_possible_moves()) == 0: #TODO trying something new this heuristic looks wrong to me
+        if state.mobility() == 0: #TODO trying something new this heuristic looks wrong to me
             return INFINITY if state.curr_player != self.color else -INFINITY
 
         my_u = 0
@@ -118,20 +119,21 @@ class Player(abstract.AbstractPlayer):
 
     # *****      better heuristic        *****#
     def utilityBetter(self, state, verbose=False):
-        if len(state.get_possible_moves()) == 0:
+        if state.mobility() == 0:
             return INFINITY if state.curr_player != self.color else -INFINITY
 
-        my_u = 0
-        op_u = 0
-        (my_u, op_u) = np.array(self.scoreOfTiles(state)) \
-                       + Player.SCORE_FRONTIER * np.array(self.countNumOfEmptyAroundTile(state)) \
-                       + np.array(self.countUnemptyColRow(state))
+        board = board_array(state, self.color)
+        (my_tiles, op_tiles) = self.scoreOfTiles(board)
+        (my_frontier, op_frontier) = self.countNumOfEmptyAroundTile(board)
+        (my_edges, op_edges) = self.countUnemptyColRow(board)
+        my_u = my_tiles + Player.param["SCORE_FRONTIER"] * my_frontier + my_edges
+        op_u = op_tiles + Player.param["SCORE_FRONTIER"] * op_frontier + op_edges
         if verbose:
-            (my_u1, op_u1) = self.scoreOfTiles(state)
+            (my_u1, op_u1) = self.scoreOfTiles(board)
             print("our score for tiles =", my_u1, "enemy score for tiles:", op_u1)
-            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(state)
+            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(board)
             print("our empty around =", my_u1, "enemy empty around:", op_u1)
-            (my_u1, op_u1) = self.countUnemptyColRow(state)
+            (my_u1, op_u1) = self.countUnemptyColRow(board)
             print("our row-col =", my_u1, "enemy rowcol:", op_u1)
             print("Total score = ", my_u - op_u)
 
@@ -146,71 +148,19 @@ class Player(abstract.AbstractPlayer):
         else:"""
         return my_u - op_u
 
-    def scoreOfTiles(self, state):
+    def scoreOfTiles(self, board):
         # Uses the initial scoring mat to evaluate the state
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += Player.DECAY * self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += Player.DECAY * self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-        Player.DECAY = Player.DECAY_INITIAL - (my_u + op_u) / Player.DECAY_FACTOR  # CHANGE
+        # The scoreMat weights are multiplied by the decay of the number of discs on the board
+        my_weights, op_weights, my_tiles, op_tiles = weighted_sums(board, self.scoreMat)
+        decay = Player.DECAY_TABLE[my_tiles + op_tiles]
+        my_u = decay * my_weights + Player.param["SCORE_ONE_TILE"] * my_tiles
+        op_u = decay * op_weights + Player.param["SCORE_ONE_TILE"] * op_tiles
         return [my_u, op_u]
 
-    def countNumOfEmptyAroundTile(self, state):
-        # Return the number of empty tiles
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += 1 if self.emptyAroundTiles(state, x, y) else 0
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += 1 if self.emptyAroundTiles(state, x, y) else 0
-        return [my_u, op_u]
+    def countNumOfEmptyAroundTile(self, board):
+        # Return the number of tiles with an empty tile around them (frontier tiles)
+        return frontier_counts(board)
 
-    def isOnBoard(self, x, y):
-        # Returns True if the coordinates are located on the board.
-        return x >= 0 and x <= 7 and y >= 0 and y <= 7
-
-    def isEmptyTile(self, state, x, y):
-        # Returns True if the coordinates are located on the board and the tile is empty
-        return self.isOnBoard(x, y) and state.board[x][y] == EM
-
-    def emptyAroundTiles(self, state, x, y):
-        # Sum the legal empty tiles around a given tile
-        for i in [-1, 0, 1]:
-            for j in [-1, 0, 1]:
-                if self.isEmptyTile(state, x - i, y - j):
-                    return True
-        return False
-
-    def countUnemptyColRow(self, state):
-        # gives a score for successive tiles at the same color
-        dic = {self.color: 0, OPPONENT_COLOR[self.color]: 0, EM: 0}
-        # iterate over first row
-        i = j = 0
-        currColor = state.board[i][j]
-        while i < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i += 1
-        # iterate over first col
-        i = j = 0
-        currColor = state.board[i][j]
-        while j < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j += 1
-        # iterate over last row
-        i = j = 7
-        currColor = state.board[i][j]
-        while i >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i -= 1
-        # iterate over last col
-        i = j = 7
-        currColor = state.board[i][j]
-        while j >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j -= 1
-
-        return [dic[self.color], dic[OPPONENT_COLOR[self.color]]]
\ No newline at end of file
+    def countUnemptyColRow(self, board):
+        # gives a score for successive tiles at the same color along the edges
+        return edge_run_counts(board)
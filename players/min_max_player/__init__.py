@@ -10,7 +10,11 @@ import time
 import copy
 from collections import defaultdict
 from utils import MiniMaxAlgorithm, MAX_DEPTH
+from time_manager import TimeManager
+from transposition import TranspositionTable
 import numpy as np
+from evaluation import board_array, weighted_sums, frontier_counts, edge_run_counts
+from features import FeatureAccumulator
 
 
 
@@ -26,21 +30,22 @@ class Player(abstract.AbstractPlayer):
     SCORE_PERIMETER_BORDER = -1
     SCORE_ONE_TILE = 1.5
     SCORE_FRONTIER = -1
-    DECAY = 1
     DECAY_INITIAL = 1.2
     DECAY_FACTOR = 250
+    TT_SIZE_MB = 16
 
 
     def __init__(self, setup_time, player_color, time_per_k_turns, k):
         abstract.AbstractPlayer.__init__(self, setup_time, player_color, time_per_k_turns, k)
-        self.clock = time.time()
-
-        # We are simply providing (remaining time / remaining turns) for each turn in round.
-        # Taking a spare time of 0.05 seconds.
-        self.turns_remaining_in_round = self.k
-        self.time_remaining_in_round = self.time_per_k_turns
-        self.time_for_current_move = self.time_remaining_in_round / self.turns_remaining_in_round - 0.05
-        miniMax = MiniMaxAlgorithm(self.utilityBetter,player_color,self.no_more_time,False)
+
+        # The time manager gives every move its share of the time left in the round, see time_manager.py.
+        self.time_manager = TimeManager(self.time_per_k_turns, self.k)
+        self.time_manager.calibrate()
+        # The table is kept for the whole game, so the subtree searched on our last move is not searched again.
+        self.transposition_table = TranspositionTable(Player.TT_SIZE_MB)
+        # The leaves are scored one by one from the FeatureAccumulator attached in get_move.
+        miniMax = MiniMaxAlgorithm(self.utilityBetter,player_color,self.no_more_time,False,
+                                   transposition_table=self.transposition_table)
         self.search = miniMax.search
 
         # divide the board into 5 categories and score them from best to worst
@@ -71,8 +76,16 @@ class Player(abstract.AbstractPlayer):
 
 
     def get_move(self, game_state, possible_moves):
-        self.clock = time.time()
-        self.time_for_current_move = self.time_remaining_in_round / self.turns_remaining_in_round - 0.05
+        self.time_manager.start_move(game_state.empty_count())
+        move = self.chooseMove(game_state, possible_moves)
+        self.time_manager.end_move()
+        return move
+
+    def chooseMove(self, game_state, possible_moves):
+    # searches for the best move, in the time given by the time manager
+        self.transposition_table.new_search()
+        # The features are then kept up to date by the search's make_move / undo_move.
+        game_state.attach(FeatureAccumulator.NAME, FeatureAccumulator(game_state, self.scoreMat))
         depth = 2
         bestMove = None
         while not(self.no_more_time()) and depth < MAX_DEPTH:
@@ -87,7 +100,7 @@ class Player(abstract.AbstractPlayer):
         return bestMove
 
     def no_more_time(self):
-        return (time.time() - self.clock) >= self.time_for_current_move
+        return self.time_manager.no_more_time()
 
     def __repr__(self):
         return '{} {}'.format(abstract.AbstractPlayer.__repr__(self), 'min_max')
@@ -95,7 +108,7 @@ class Player(abstract.AbstractPlayer):
 
     #*****      simple heuristic        *****#
     def utilitySimple(self, state):
-        if len(state.get_possible_moves()) == 0: #TODO trying something new this heuristic looks wrong to me
+        if state.mobility() == 0: #TODO trying something new this heuristic looks wrong to me
             return INFINITY if state.curr_player != self.color else -INFINITY
 
         my_u = 0
@@ -121,20 +134,24 @@ class Player(abstract.AbstractPlayer):
 
     # *****      better heuristic        *****#
     def utilityBetter(self, state, verbose=False):
-        if len(state.get_possible_moves()) == 0:
+        if state.mobility() == 0:
             return INFINITY if state.curr_player != self.color else -INFINITY
 
-        my_u = 0
-        op_u = 0
-        (my_u, op_u) = np.array(self.scoreOfTiles(state)) \
-                       + Player.SCORE_FRONTIER * np.array(self.countNumOfEmptyAroundTile(state)) \
-                       + np.array(self.countUnemptyColRow(state))
+        features = state.accumulators.get(FeatureAccumulator.NAME)
+        if features is not None and not verbose:
+            return self.utilityFeatures(features)
+        board = board_array(state, self.color)
+        (my_tiles, op_tiles) = self.scoreOfTiles(board)
+        (my_frontier, op_frontier) = self.countNumOfEmptyAroundTile(board)
+        (my_edges, op_edges) = self.countUnemptyColRow(board)
+        my_u = my_tiles + Player.SCORE_FRONTIER * my_frontier + my_edges
+        op_u = op_tiles + Player.SCORE_FRONTIER * op_frontier + op_edges
         if verbose:
-            (my_u1, op_u1) = self.scoreOfTiles(state)
+            (my_u1, op_u1) = self.scoreOfTiles(board)
             print("our score for tiles =", my_u1, "enemy score for tiles:", op_u1)
-            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(state)
+            (my_u1, op_u1) = self.countNumOfEmptyAroundTile(board)
             print("our empty around =", my_u1, "enemy empty around:", op_u1)
-            (my_u1, op_u1) = self.countUnemptyColRow(state)
+            (my_u1, op_u1) = self.countUnemptyColRow(board)
             print("our row-col =", my_u1, "enemy rowcol:", op_u1)
             print("Total score = ", my_u - op_u)
 
@@ -148,72 +165,26 @@ class Player(abstract.AbstractPlayer):
 
         else:"""
         return my_u - op_u
-    def scoreOfTiles(self, state):
-    # Uses the initial scoring mat to evaluate the state
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += Player.DECAY_INITIAL*self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += Player.DECAY_INITIAL*self.scoreMat[x][y] + Player.SCORE_ONE_TILE
-        return [my_u,op_u]
 
-    def countNumOfEmptyAroundTile(self, state):
-    # Return the number of empty tiles
-        my_u = op_u = 0
-        for x in range(BOARD_COLS):
-            for y in range(BOARD_ROWS):
-                if state.board[x][y] == self.color:
-                    my_u += 1 if self.emptyAroundTiles(state,x,y) else 0
-                if state.board[x][y] == OPPONENT_COLOR[self.color]:
-                    op_u += 1 if self.emptyAroundTiles(state,x,y) else 0
-        return [my_u,op_u]
+    def utilityFeatures(self, features):
+    # utilityBetter of a position without moves checks, read from its FeatureAccumulator
+        my_tiles, op_tiles, my_weights, op_weights, my_frontier, op_frontier = features.features(self.color)
+        my_edges, op_edges = features.edge_runs(self.color)
+        my_u = Player.DECAY_INITIAL*my_weights + Player.SCORE_ONE_TILE*my_tiles + Player.SCORE_FRONTIER*my_frontier + my_edges
+        op_u = Player.DECAY_INITIAL*op_weights + Player.SCORE_ONE_TILE*op_tiles + Player.SCORE_FRONTIER*op_frontier + op_edges
+        return my_u - op_u
 
+    def scoreOfTiles(self, board):
+    # Uses the initial scoring mat to evaluate the state
+        my_weights, op_weights, my_tiles, op_tiles = weighted_sums(board, self.scoreMat)
+        my_u = Player.DECAY_INITIAL*my_weights + Player.SCORE_ONE_TILE*my_tiles
+        op_u = Player.DECAY_INITIAL*op_weights + Player.SCORE_ONE_TILE*op_tiles
+        return [my_u,op_u]
 
+    def countNumOfEmptyAroundTile(self, board):
+    # Return the number of tiles with an empty tile around them (frontier tiles)
+        return frontier_counts(board)
 
-    def isOnBoard(self, x, y):
-    # Returns True if the coordinates are located on the board.
-        return x >= 0 and x <= 7 and y >= 0 and y <=7
-
-    def isEmptyTile(self,state,x,y):
-    # Returns True if the coordinates are located on the board and the tile is empty
-        return self.isOnBoard(x,y) and state.board[x][y] == EM
-
-    def emptyAroundTiles(self,state,x,y):
-    # Sum the legal empty tiles around a given tile
-        for i in [-1,0,1]:
-            for j in [-1,0,1]:
-                if self.isEmptyTile(state, x - i, y - j):
-                    return True
-        return False
-
-    def countUnemptyColRow(self,state):
-    # gives a score for successive tiles at the same color
-        dic = {self.color : 0, OPPONENT_COLOR[self.color] : 0 , EM : 0}
-        # iterate over first row
-        i = j = 0
-        currColor = state.board[i][j]
-        while i < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i += 1
-        # iterate over first col
-        i = j = 0
-        currColor = state.board[i][j]
-        while j < 8 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j += 1
-        # iterate over last row
-        i = j = 7
-        currColor = state.board[i][j]
-        while  i >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            i -= 1
-        # iterate over last col
-        i = j = 7
-        currColor = state.board[i][j]
-        while j >= 0 and state.board[i][j] == currColor:
-            dic[currColor] += 1
-            j -= 1
-
-        return [dic[self.color],dic[OPPONENT_COLOR[self.color]]]
\ No newline at end of file
+    def countUnemptyColRow(self,board):
+    # gives a score for successive tiles at the same color along the edges
+        return edge_run_counts(board)
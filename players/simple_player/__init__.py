@@ -7,8 +7,9 @@ import abstract
 from utils import INFINITY, run_with_limited_time, ExceededTimeError
 from Reversi.consts import EM, OPPONENT_COLOR, BOARD_COLS, BOARD_ROWS
 import time
-import copy
 from collections import defaultdict
+from evaluation import children_boards
+import numpy as np
 
 #===============================================================================
 # Player
@@ -31,17 +32,11 @@ class Player(abstract.AbstractPlayer):
         if len(possible_moves) == 1:
             return possible_moves[0]
 
-        best_move = possible_moves[0]
-        next_state = copy.deepcopy(game_state)
-        next_state.perform_move(best_move[0],best_move[1])
-        # Choosing an arbitrary move
-        # Get the best move according the utility function
-        for move in possible_moves:
-            new_state = copy.deepcopy(game_state)
-            new_state.perform_move(move[0],move[1])
-            if self.utility(new_state) > self.utility(next_state):
-                next_state = new_state
-                best_move = move
+        # Get the best move according the utility function, evaluating all the moves at once.
+        # argmax returns the first best move.
+        boards, no_moves = children_boards(game_state, self.color, possible_moves)
+        scores = self.batch_utility(boards, OPPONENT_COLOR[game_state.curr_player], no_moves)
+        best_move = possible_moves[int(np.argmax(scores))]
 
         if self.turns_remaining_in_round == 1:
             self.turns_remaining_in_round = self.k
@@ -53,7 +48,7 @@ class Player(abstract.AbstractPlayer):
         return best_move
 
     def utility(self, state):
-        if len(state.get_possible_moves()) == 0:
+        if state.mobility() == 0:
             return INFINITY if state.curr_player != self.color else -INFINITY
 
         my_u = 0
@@ -74,6 +69,13 @@ class Player(abstract.AbstractPlayer):
         else:
             return my_u - op_u
         
+    def batch_utility(self, boards, curr_player, no_moves):
+        # The utility of a stack of boards viewed by this player (see evaluation.children_boards).
+        my_u = (boards == 1).sum(axis=(1, 2))
+        op_u = (boards == -1).sum(axis=(1, 2))
+        scores = np.where(my_u == 0, -INFINITY, np.where(op_u == 0, INFINITY, my_u - op_u))
+        return np.where(no_moves, INFINITY if curr_player != self.color else -INFINITY, scores)
+
     def selective_deepening_criterion(self, state):
         # Simple player does not selectively deepen into certain nodes.
         return False
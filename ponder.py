@@ -0,0 +1,112 @@
+"""Pondering: searching on the opponent's time.
+
+The runner only charges a player for the time spent inside its get_move, so after returning a move the player can keep
+searching in a background thread until its next get_move: either the position after the opponent's predicted reply
+(the second move of the principal variation), or the positions after all of the opponent's replies, one depth at a
+time for all of them. The searches share the player's transposition table, move orderer and evaluation cache, which
+stay warm, and the result of every pondered position is kept. The next get_move stops the thread before it searches,
+and continues from the result of the actual position if it was pondered.
+
+The pondering thread holds the GIL while it searches, so it slows an opponent that runs in the same process.
+"""
+import threading
+from utils import INFINITY
+
+
+# The time left of a pondering search, which only stops when the next get_move stops it.
+NO_TIME_LIMIT = float('inf')
+
+
+class Ponderer:
+
+    def __init__(self, mode='predicted'):
+        """Initialize the ponderer. The thread is started by start, so the object can be pickled until then.
+
+        :param mode: 'predicted' - ponder the opponent's predicted reply, or all the replies if there is no prediction.
+                     'all' - ponder all the opponent's replies.
+        """
+        self.mode = mode
+        # The IterativeDeepening to ponder with, set by the player. Its searches must stop with self.no_more_time.
+        self.deepening = None
+        self.thread = None
+        self.stop_event = None
+        # Zobrist key -> the result of an IterativeDeepening run on the pondered position (see IterativeDeepening.result).
+        self.results = {}
+        # Positions that were pondered (hits) or not (misses) when the player had to move, for statistics.
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['thread'] = None
+        state['stop_event'] = None
+        return state
+
+    def no_more_time(self):
+        return self.stop_event.is_set()
+
+    def time_left(self):
+        return NO_TIME_LIMIT
+
+    def start(self, state, move, pv):
+        """Starts pondering after our move.
+
+        :param state: The position we moved in. It is not changed.
+        :param move: The move we played.
+        :param pv: The principal variation of the search that chose the move, or an empty list.
+        """
+        self.stop()
+        self.results = {}
+        state = state.copy()
+        state.make_move(move[0], move[1])
+        replies = state.get_possible_moves()
+        if self.mode == 'predicted' and len(pv) > 1 and pv[0] == move and pv[1] in replies:
+            replies = [pv[1]]
+        if not replies:
+            return
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._ponder, args=(state, replies))
+        # The game may end while we ponder.
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, key=None):
+        """Stops pondering.
+
+        :param key: The Zobrist key of the position we have to move in, or None.
+        :return: The result kept for that position, or None if it was not pondered.
+        """
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        if key is None:
+            return None
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _ponder(self, state, replies):
+        # Deepens the positions after all the replies by one depth at a time, until stopped or until none of them gets
+        # deeper (forced moves, decided games and searches that reach the end of the game).
+        deepening = self.deepening
+        progressed = True
+        while progressed and not self.no_more_time():
+            progressed = False
+            for reply in replies:
+                state.make_move(reply[0], reply[1])
+                moves = state.get_possible_moves()
+                result = self.results.get(state.key)
+                depth = result[0] if result is not None else 0
+                decided = result is not None and abs(result[1][-1]) >= INFINITY
+                if moves and not decided and depth < state.empty_count():
+                    deepening.run(state, moves, max_depth=depth + 2, resume=result)
+                    if deepening.depth > depth:
+                        self.results[state.key] = deepening.result()
+                        progressed = True
+                state.undo_move()
+                if self.no_more_time():
+                    break
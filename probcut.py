@@ -0,0 +1,224 @@
+"""Multi-ProbCut forward pruning.
+
+The score of a deep search is well predicted by the score of a shallow search of the same position: deep = a * shallow
++ b, with a normally distributed error of deviation sigma. Before searching a node to a depth, MultiProbCut searches it
+to one or more shallower depths, with a null window at the shallow score that predicts, with high confidence, a deep
+score outside of the node's window. If the shallow search confirms it, the node is cut without the deep search. The
+saved time goes into deeper iterations.
+
+There is a linear model per game stage, depth and shallow depth, fitted by the calibration tool from logged searches:
+    python -m probcut collect [positions] [max depth] [log file] - searches random positions to every depth up to the
+                                                                   max depth, and logs their scores.
+    python -m probcut fit [log file] [models file] - fits the models to a log, and writes them to a JSON file.
+Searches deeper than the calibrated depths use the model of the deepest calibrated depth with the same depth gap.
+"""
+from __future__ import print_function, division
+import json
+import os
+import sys
+import numpy as np
+from utils import INFINITY, NULL_WINDOW, MiniMaxWithAlphaBetaPruning
+from transposition import TranspositionTable
+from move_ordering import MoveOrderer
+from features import FeatureAccumulator
+
+
+MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'probcut.json')
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'probcut_log.jsonl')
+# Number of game stages, by the number of empty squares.
+STAGES = 4
+# The depths gaps between a deep search and the shallow searches that check it, largest first.
+DEPTH_GAPS = (4, 2)
+# Nodes shallower than this are not checked.
+MIN_DEPTH = 3
+# The deepest nodes checked.
+MAX_DEPTH = 20
+# The number of sigmas the prediction must be outside of the window by. Higher is safer and prunes less.
+THRESHOLD = 1.5
+# Models fitted to fewer samples are not used.
+MIN_SAMPLES = 20
+
+
+def get_stage(empties):
+    """Returns the game stage of a position with the given number of empty squares, 0 being the opening."""
+    return min(STAGES - 1, max(0, 60 - empties) * STAGES // 60)
+
+
+def check_depths(depth):
+    """Returns the shallow depths a node of the given depth is checked with."""
+    return [depth - gap for gap in DEPTH_GAPS if depth - gap >= 1]
+
+
+class MultiProbCut:
+    """Forward pruning for MiniMaxWithAlphaBetaPruning, passed as its selective_deepening."""
+
+    def __init__(self, models_path=MODELS_PATH, threshold=THRESHOLD):
+        """Loads the models. Without a models file, nothing is pruned.
+
+        :param models_path: A file written by save_models, or None.
+        :param threshold: See THRESHOLD.
+        """
+        models = []
+        if models_path is not None and os.path.exists(models_path):
+            models = load_models(models_path)
+        self.threshold = threshold
+        # (stage, depth) -> a list of (shallow depth, a, b, threshold * sigma) of the checks of the node.
+        self.checks = {}
+        fitted = dict(((model['stage'], model['depth'], model['shallow_depth']), model) for model in models
+                      if model['samples'] >= MIN_SAMPLES and model['a'] > 0)
+        for stage in range(STAGES):
+            for depth in range(MIN_DEPTH, MAX_DEPTH + 1):
+                checks = []
+                for shallow_depth in check_depths(depth):
+                    model = self._find_model(fitted, stage, depth, depth - shallow_depth)
+                    if model is not None:
+                        checks.append((shallow_depth, model['a'], model['b'], threshold * model['sigma']))
+                if checks:
+                    self.checks[(stage, depth)] = checks
+        # Statistics: nodes checked and nodes cut.
+        self.probes = 0
+        self.cuts = 0
+
+    @staticmethod
+    def _find_model(fitted, stage, depth, gap):
+        for model_depth in range(depth, gap, -1):
+            model = fitted.get((stage, model_depth, model_depth - gap))
+            if model is not None:
+                return model
+        return None
+
+    def cut(self, search, state, depth, alpha, beta, maximizing_player):
+        """Checks whether a node can be cut.
+
+        :param search: The MiniMaxWithAlphaBetaPruning searching the node.
+        :return: None if the node must be searched. Otherwise a tuple (beta if the node's score is predicted to be at
+                 least beta, or alpha if it is predicted to be at most alpha, the best move of the shallow search).
+        """
+        checks = self.checks.get((get_stage(state.empty_count()), depth))
+        if checks is None:
+            return None
+        self.probes += 1
+        for shallow_depth, a, b, margin in checks:
+            # The models are fitted with the side to move as the searching player. Scores of the opponent's positions
+            # are negated, which negates the intercept.
+            if not maximizing_player:
+                b = -b
+            if beta < INFINITY:
+                bound = (beta + margin - b) / a
+                if bound < INFINITY:
+                    score, move = search.search(state, shallow_depth, bound - NULL_WINDOW, bound, maximizing_player)
+                    if score >= bound:
+                        self.cuts += 1
+                        return beta, move
+            if alpha > -INFINITY:
+                bound = (alpha - margin - b) / a
+                if bound > -INFINITY:
+                    score, move = search.search(state, shallow_depth, bound, bound + NULL_WINDOW, maximizing_player)
+                    if score <= bound:
+                        self.cuts += 1
+                        return alpha, move
+        return None
+
+
+#===============================================================================
+# Calibration
+#===============================================================================
+
+def search_scores(state, utility, max_depth):
+    """Returns the full window alpha-beta scores of a position at the depths 1 to max_depth, from the point of view of
+    the side to move.
+    """
+    scores = []
+    for depth in range(1, max_depth + 1):
+        # A fresh table for every depth, so that deeper results do not leak into shallower searches.
+        alpha_beta = MiniMaxWithAlphaBetaPruning(utility, state.curr_player, lambda: False, False,
+                                                 TranspositionTable(4), MoveOrderer())
+        score, _ = alpha_beta.search(state, depth, -INFINITY, INFINITY, True)
+        scores.append(score)
+    return scores
+
+
+def collect(count=200, max_depth=6, log_path=LOG_PATH):
+    """Searches random positions with competition_player's heuristic, and appends their scores to a log: a JSON object
+    per line, {"empties": empty squares, "scores": [score at depth 1, score at depth 2, ...]}.
+    """
+    from benchmarks.positions import benchmark_positions
+    from players.competition_player import Player
+    directory = os.path.dirname(log_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(log_path, 'a') as log_file:
+        for i, state in enumerate(benchmark_positions(count, seed=1, min_ply=4, max_ply=50)):
+            player = Player(1, state.curr_player, 1, 1)
+            state.attach(FeatureAccumulator.NAME, FeatureAccumulator(state, player.scoreMat))
+            scores = search_scores(state, player.utilityBetter, max_depth)
+            log_file.write(json.dumps({'empties': state.empty_count(), 'scores': scores}) + '\n')
+            log_file.flush()
+            print('{}/{}'.format(i + 1, count), file=sys.stderr)
+
+
+def fit_models(records):
+    """Fits deep = a * shallow + b by least squares for every stage, depth and shallow depth in check_depths.
+
+    :param records: The log records, see collect.
+    :return: A list of models: dicts with the stage, depth, shallow_depth, a, b, sigma (the deviation of the error) and
+             the number of samples.
+    """
+    samples = {}
+    for record in records:
+        stage = get_stage(record['empties'])
+        scores = record['scores']
+        for depth in range(MIN_DEPTH, len(scores) + 1):
+            for shallow_depth in check_depths(depth):
+                shallow, deep = scores[shallow_depth - 1], scores[depth - 1]
+                # Decided games are not on the line.
+                if abs(shallow) < INFINITY and abs(deep) < INFINITY:
+                    samples.setdefault((stage, depth, shallow_depth), []).append((shallow, deep))
+    models = []
+    for (stage, depth, shallow_depth), pairs in sorted(samples.items()):
+        shallow, deep = np.array(pairs).T
+        if len(pairs) < 2 or shallow.std() == 0:
+            continue
+        a, b = np.polyfit(shallow, deep, 1)
+        sigma = (deep - (a * shallow + b)).std()
+        models.append({'stage': stage, 'depth': depth, 'shallow_depth': shallow_depth, 'a': float(a), 'b': float(b),
+                       'sigma': float(sigma), 'samples': len(pairs)})
+    return models
+
+
+def load_log(log_path=LOG_PATH):
+    with open(log_path) as log_file:
+        return [json.loads(line) for line in log_file if line.strip()]
+
+
+def save_models(models, path=MODELS_PATH):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as models_file:
+        json.dump({'stages': STAGES, 'models': models}, models_file, indent=1)
+
+
+def load_models(path=MODELS_PATH):
+    """Reads models written by save_models.
+
+    :raises ValueError: If the file was fitted with a different number of stages.
+    """
+    with open(path) as models_file:
+        data = json.load(models_file)
+    if data['stages'] != STAGES:
+        raise ValueError('{} was fitted with {} stages, not {}'.format(path, data['stages'], STAGES))
+    return data['models']
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'collect':
+        collect(*[int(arg) for arg in sys.argv[2:4]] + sys.argv[4:5])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'fit':
+        models = fit_models(load_log(*sys.argv[2:3]))
+        save_models(models, *sys.argv[3:4])
+        for model in models:
+            print('stage {stage} depth {depth} <- {shallow_depth}: deep = {a:.3f} * shallow + {b:+.2f}, '
+                  'sigma {sigma:.2f} ({samples} samples)'.format(**model))
+    else:
+        print(__doc__)
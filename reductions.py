@@ -0,0 +1,42 @@
+"""Late-move reductions for the alpha-beta search.
+
+With move ordering, the best move of a node is almost always one of its first moves: the hash move, the corners and the
+killers. Late moves - the ones after them - are searched to a reduced depth with a null window, which only proves that
+they are not better than the best move so far. A late move that is not proven worse is searched again to the full
+depth, so a reduction can cost a move, but never hides a better one that the reduced search sees.
+
+The reductions are a table of (minimum depth, minimum move index, plies), see REDUCTIONS.
+"""
+
+
+# (Minimum depth, minimum move index, plies to reduce by), the first matching row applies. Move indexes count from 0, in
+# the order of the move orderer. Deeper nodes and later moves are reduced more.
+REDUCTIONS = ((6, 8, 2), (3, 3, 1))
+
+
+class LateMoveReductions:
+
+    def __init__(self, reductions=REDUCTIONS):
+        """Initialize the reductions.
+
+        :param reductions: See REDUCTIONS.
+        """
+        # reduction_table[depth] is a list of (minimum move index, plies) for the nodes of that depth, by move index.
+        max_depth = max(min_depth for min_depth, _, _ in reductions) if reductions else 0
+        self.reduction_table = [[(min_index, plies) for min_depth, min_index, plies in reductions if depth >= min_depth]
+                                for depth in range(max_depth + 1)]
+        # Statistics: moves searched to a reduced depth, and the ones of them searched again to the full depth.
+        self.reduced = 0
+        self.re_searched = 0
+
+    def reduction(self, depth, index):
+        """Returns the number of plies to reduce the search of a move by.
+
+        :param depth: The depth of the node.
+        :param index: The index of the move in the node's ordered moves.
+        """
+        for min_index, plies in self.reduction_table[min(depth, len(self.reduction_table) - 1)]:
+            if index >= min_index:
+                # A reduced search is at least 1 ply deep.
+                return max(0, min(plies, depth - 2))
+        return 0
@@ -81,13 +81,13 @@ class GameRunner:
             player = self.players[board_state.curr_player]
             remaining_run_time = remaining_run_times[board_state.curr_player]
             try:
-                possible_moves = board_state.get_possible_moves()
+                possible_moves = [move for move, _ in board_state.get_moves_with_flips()]
                 if not possible_moves:
                     winner = self.make_winner_result(board_state.get_winner())
                     break
                 # Get move from player
                 move, run_time = utils.run_with_limited_time(
-                    player.get_move, (copy.deepcopy(board_state), possible_moves), {}, remaining_run_time*1.5) ###
+                    player.get_move, (board_state.copy(), possible_moves), {}, remaining_run_time*1.5) ###
                 
                 remaining_run_times[board_state.curr_player] -= run_time
                 if remaining_run_times[board_state.curr_player] < 0:
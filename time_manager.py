@@ -0,0 +1,133 @@
+"""Time management for the searching players.
+
+The runner gives each player time_per_k_turns seconds for every k of its moves, and the time a move does not use is
+still there for the next moves of the round. The TimeManager keeps track of the time and turns left in the round, and
+gives every move a budget from them:
+- The time left is shared between the moves expected in the rest of the round - the turns left, or fewer if the game
+  is about to end - weighted by the game phase of each one. Whatever a move does not use is carried forward.
+- The runner's clock sees a little more of every move than the player's: the overhead, which is charged to every move
+  on top of the time it measured. It is calibrated at setup from the overhead of utils.run_with_limited_time.
+- A safety margin is kept back for every move, for the time between the search stopping and the runner getting the move.
+  It is a multiple of the overhead, and is raised when a move overruns.
+- The searches poll no_more_time at every node, and it only reads the clock once every POLL_INTERVAL calls. Once it
+  returns True, it keeps returning True until the next move, so every part of the search sees the same answer.
+"""
+from __future__ import division
+import time
+from utils import run_with_limited_time
+
+
+# no_more_time reads the clock once every this many calls (a power of 2).
+POLL_INTERVAL = 32
+# The smallest safety margin of a move, in seconds.
+MIN_SAFETY_MARGIN = 0.02
+# The safety margin is this many times the largest overhead measured, up to this share of the average move time.
+OVERHEAD_FACTOR = 3.0
+MAX_SAFETY_MARGIN_SHARE = 0.25
+# Number of run_with_limited_time calls measured by calibrate.
+CALIBRATION_RUNS = 3
+# (Lowest number of empty squares, weight) of the game phases: the share of the time a move gets, relative to the other
+# moves of the round. The midgame decides most games, and the endgame solver needs little time.
+PHASE_WEIGHTS = ((45, 0.75), (21, 1.25), (0, 1.0))
+
+
+def phase_weight(empties, phase_weights=PHASE_WEIGHTS):
+    """Returns the weight of a move made with the given number of empty squares."""
+    for min_empties, weight in phase_weights:
+        if empties >= min_empties:
+            return weight
+    return phase_weights[-1][1]
+
+
+def _measure_overhead():
+    # Runs in the thread of run_with_limited_time, and returns the time it started.
+    return time.time()
+
+
+class TimeManager:
+
+    def __init__(self, time_per_k_turns, k, phase_weights=PHASE_WEIGHTS):
+        """Initialize the round.
+
+        :param time_per_k_turns: The time of every k turns, in seconds.
+        :param k: The number of turns in a round.
+        :param phase_weights: See PHASE_WEIGHTS.
+        """
+        self.time_per_k_turns = time_per_k_turns
+        self.k = k
+        self.phase_weights = phase_weights
+        self.turns_remaining_in_round = k
+        self.time_remaining_in_round = time_per_k_turns
+        self.overhead = 0.0
+        self.safety_margin = MIN_SAFETY_MARGIN
+        # The current move: its start time and budget, and the state of no_more_time.
+        self.clock = time.time()
+        self.budget = time_per_k_turns / k - self.safety_margin
+        self.calls = 0
+        self.stopped = False
+
+    def calibrate(self, extra_overhead=0.0):
+        """Sets the overhead and the safety margin from the overhead of running a function through
+        utils.run_with_limited_time, the way the runner runs get_move: the time it takes that the function itself does
+        not see.
+
+        :param extra_overhead: Time to add to the overhead of every move, e.g. sys.getswitchinterval() for a player
+                               that keeps a thread running after get_move returns, which may hold the GIL that long.
+        """
+        overhead = 0.0
+        for _ in range(CALIBRATION_RUNS):
+            before = time.time()
+            started, measured_time = run_with_limited_time(_measure_overhead, (), {}, 1.0)
+            overhead = max(overhead, started - before, time.time() - before - measured_time)
+        self.overhead = overhead + extra_overhead
+        self.safety_margin = self._bounded_margin(OVERHEAD_FACTOR * self.overhead)
+
+    def _bounded_margin(self, margin):
+        return min(max(MIN_SAFETY_MARGIN, margin), MAX_SAFETY_MARGIN_SHARE * self.time_per_k_turns / self.k)
+
+    def start_move(self, empties):
+        """Starts the clock of a move and gives it its budget.
+
+        :param empties: The number of empty squares on the board.
+        """
+        self.clock = time.time()
+        self.calls = 0
+        self.stopped = False
+        # We play one move of every two, so the game ends after about half of the empty squares.
+        turns = max(1, min(self.turns_remaining_in_round, (empties + 1) // 2))
+        weights = [phase_weight(empties - 2 * turn, self.phase_weights) for turn in range(turns)]
+        available = self.time_remaining_in_round - self.turns_remaining_in_round * self.safety_margin
+        self.budget = max(0.0, available * weights[0] / sum(weights))
+
+    def end_move(self):
+        """Charges the move's time and the overhead to the round, and starts a new round after the last turn of one."""
+        spent = time.time() - self.clock
+        # A move that went past its budget shows how long it takes to stop.
+        if spent > self.budget:
+            self.safety_margin = self._bounded_margin(max(self.safety_margin, OVERHEAD_FACTOR * (spent - self.budget)))
+        if self.turns_remaining_in_round == 1:
+            self.turns_remaining_in_round = self.k
+            self.time_remaining_in_round = self.time_per_k_turns
+        else:
+            self.turns_remaining_in_round -= 1
+            self.time_remaining_in_round -= spent + self.overhead
+
+    def elapsed(self):
+        return time.time() - self.clock
+
+    def time_left(self):
+        return self.budget - (time.time() - self.clock)
+
+    def no_more_time(self):
+        """Returns True when the move's budget is spent. Polls the clock once every POLL_INTERVAL calls."""
+        if self.stopped:
+            return True
+        self.calls += 1
+        if self.calls & (POLL_INTERVAL - 1):
+            return False
+        self.stopped = time.time() - self.clock >= self.budget
+        return self.stopped
+
+    def no_more_time_for(self, share):
+        """Returns True when the given share of the move's budget is spent. Reads the clock on every call."""
+        return time.time() - self.clock >= self.budget * share
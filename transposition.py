@@ -0,0 +1,174 @@
+"""Fixed size transposition tables for the alpha-beta search.
+"""
+from multiprocessing import shared_memory
+
+# Bound types of a stored score.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+
+    # Rough size in bytes of a single entry (the slot and its tuple), used to turn a memory cap into a slot count.
+    ENTRY_SIZE = 160
+
+    def __init__(self, max_memory_mb=16):
+        """Initialize an empty table.
+
+        :param max_memory_mb: Memory cap of the table in megabytes. The number of slots is derived from it.
+        """
+        self.size = max(1, int(max_memory_mb * 1024 * 1024) // TranspositionTable.ENTRY_SIZE)
+        self.entries = [None] * self.size
+        # Age of the current search. Entries from older searches are replaced first.
+        self.generation = 0
+
+    def new_search(self):
+        """Marks the beginning of a new search (e.g. a new get_move). Entries stored until now become old."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+    def probe(self, key):
+        """Looks up a position.
+
+        :param key: The Zobrist key of the position (GameState.key).
+        :return: A tuple (key, depth, bound type, score, best move, generation), or None if the position is not stored.
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        """Stores a search result, using a depth-preferred replacement policy with aging.
+
+        The slot is overwritten if it is empty, holds the same position, holds an entry from an older search, or holds
+        an entry searched to a depth not greater than the new one.
+
+        :param key: The Zobrist key of the position.
+        :param depth: The depth the position was searched to.
+        :param flag: EXACT, LOWER_BOUND or UPPER_BOUND.
+        :param score: The fail-soft search score.
+        :param move: The best move found, or None.
+        """
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or entry[5] != self.generation or entry[1] <= depth:
+            self.entries[index] = (key, depth, flag, score, move, self.generation)
+
+
+# Layout of a SharedTranspositionTable entry's data word.
+_DEPTH_MASK = 0xFF
+_FLAG_SHIFT = 8
+_MOVE_SHIFT = 10
+_GENERATION_SHIFT = 17
+_VALID_BIT = 1 << 31
+# The [x, y] move of each square. The probed entries share them, like the entries of TranspositionTable share the moves
+# they were stored with.
+_SQUARE_MOVES = tuple([sq >> 3, sq & 7] for sq in range(64))
+
+
+class SharedTranspositionTable:
+    """A transposition table in a multiprocessing.shared_memory block, which several processes can search with at once
+    (e.g. Lazy-SMP, see parallel.LazySMPSearch). It has the same methods and replacement policy as TranspositionTable.
+
+    The block holds a header word with the search generation, and then a flat array of 24 byte entries: the key XOR-ed
+    with the other two words, a data word (depth, bound type, move, generation and a valid bit) and the score. Access
+    is lock-free: a write torn by another process leaves an entry whose words do not XOR back to its key, so it is
+    treated as missing.
+
+    The object can be pickled (e.g. into the worker processes of a pool); the copy attaches to the same block. The
+    process that created the table must call close(unlink=True) when done.
+    """
+
+    ENTRY_SIZE = 24
+
+    def __init__(self, max_memory_mb=16, name=None):
+        """Creates a new table, or attaches to an existing one.
+
+        :param max_memory_mb: Memory cap of the table in megabytes, used when creating it.
+        :param name: The shared memory name of an existing table (see the name attribute), or None to create one.
+        """
+        if name is None:
+            size = max(1, int(max_memory_mb * 1024 * 1024) // SharedTranspositionTable.ENTRY_SIZE)
+            self._shm = shared_memory.SharedMemory(create=True, size=8 + size * SharedTranspositionTable.ENTRY_SIZE)
+            self._shm.buf[:] = bytes(self._shm.size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.size = (self._shm.size - 8) // SharedTranspositionTable.ENTRY_SIZE
+        self._words = self._shm.buf.cast('Q')
+        self._floats = self._shm.buf.cast('d')
+        # Statistics of this process.
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+
+    def __getstate__(self):
+        return {'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(name=state['name'])
+
+    def close(self, unlink=False):
+        """Detaches from the block, and frees it if unlink is True."""
+        self._words.release()
+        self._floats.release()
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+    @property
+    def generation(self):
+        return self._words[0]
+
+    def new_search(self):
+        """Marks the beginning of a new search in all the processes. Entries stored until now become old."""
+        self._words[0] = (self._words[0] + 1) & 0xFF
+
+    def clear(self):
+        self._shm.buf[:] = bytes(self._shm.size)
+
+    def probe(self, key):
+        """Looks up a position, like TranspositionTable.probe."""
+        self.probes += 1
+        words = self._words
+        i = 1 + 3 * (key % self.size)
+        data = words[i + 1]
+        if not data & _VALID_BIT:
+            return None
+        if words[i] ^ data ^ words[i + 2] != key:
+            self.collisions += 1
+            return None
+        score = self._floats[i + 2]
+        # The score may have been overwritten since the check. Checking again is cheaper than a lock.
+        if words[i] ^ words[i + 1] ^ words[i + 2] != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        sq = (data >> _MOVE_SHIFT) & 0x7F
+        return (key, data & _DEPTH_MASK, (data >> _FLAG_SHIFT) & 0x3, score,
+                _SQUARE_MOVES[sq - 1] if sq else None, (data >> _GENERATION_SHIFT) & 0xFF)
+
+    def store(self, key, depth, flag, score, move):
+        """Stores a search result, like TranspositionTable.store."""
+        words = self._words
+        generation = words[0]
+        i = 1 + 3 * (key % self.size)
+        old_data = words[i + 1]
+        if old_data & _VALID_BIT and words[i] ^ old_data ^ words[i + 2] != key and \
+                (old_data >> _GENERATION_SHIFT) & 0xFF == generation and old_data & _DEPTH_MASK > depth:
+            return
+        data = min(depth, _DEPTH_MASK) | flag << _FLAG_SHIFT | generation << _GENERATION_SHIFT | _VALID_BIT
+        if move is not None:
+            data |= (8 * move[0] + move[1] + 1) << _MOVE_SHIFT
+        self._floats[i + 2] = score
+        words[i + 1] = data
+        words[i] = key ^ data ^ words[i + 2]
+
+    def stats(self):
+        """Returns the statistics of this process: {'probes', 'hits', 'hit_rate', 'collisions'}."""
+        return {'probes': self.probes, 'hits': self.hits,
+                'hit_rate': self.hits / float(self.probes) if self.probes else 0.0, 'collisions': self.collisions}
@@ -4,13 +4,18 @@
 from threading import Thread
 from multiprocessing import Queue
 import time
-import copy
 from Reversi.board import GameState
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND
+from Reversi.consts import TIE
 
 
 
 INFINITY = float(6000)
 MAX_DEPTH = 100
+# Width of the null windows of the principal variation search. The scores are floats, so a null window is a tiny one.
+NULL_WINDOW = 1e-6
+# See MiniMaxWithAlphaBetaPruning.mtdf.
+MTDF_MAX_PASSES = 12
 
 
 class ExceededTimeError(RuntimeError):
@@ -66,9 +71,29 @@ def run_with_limited_time(func, args, kwargs, time_limit):
     return q_get
 
 
+def final_score(state, my_color):
+    """Returns the score of a position where the game is over, decided by the discs like GameState.get_winner: INFINITY
+    if my_color won, -INFINITY if it lost, and 0 for a tie.
+    """
+    winner = state.get_winner()
+    if winner == TIE:
+        return 0.0
+    return INFINITY if winner == my_color else -INFINITY
+
+
+def leaf_score(utility, state, my_color):
+    """Returns the utility of a leaf. The utilities score positions without moves, where the game is over, as a win or a
+    loss for the side that cannot move; their real result is decided by the discs.
+    """
+    score = utility(state)
+    if abs(score) >= INFINITY:
+        return final_score(state, my_color)
+    return score
+
+
 class MiniMaxAlgorithm:
 
-    def __init__(self, utility, my_color, no_more_time, selective_deepening):
+    def __init__(self, utility, my_color, no_more_time, selective_deepening, eval_cache=None, transposition_table=None):
         """Initialize a MiniMax algorithms without alpha-beta pruning.
 
         :param utility: The utility function. Should have state as parameter.
@@ -79,130 +104,544 @@ class MiniMaxAlgorithm:
                         returns True when the algorithm should continue the search
                         for the minimax value recursivly from this state.
                         optional
+        :param eval_cache: An eval_cache.EvalCache that the utility calls go through, or None. optional
+        :param transposition_table: A transposition.TranspositionTable to store search results in, or None. Without
+                        pruning every completed result is exact, so a position stored at a depth is not searched
+                        again to that depth, in this search or in the searches of the next moves. optional
         """
 
-        self.utility = utility
+        self.utility = utility if eval_cache is None else eval_cache.wrap(utility)
+        self.eval_cache = eval_cache
         self.my_color = my_color
         self.no_more_time = no_more_time
         self.selective_deepening = selective_deepening
+        self.transposition_table = transposition_table
+        # Number of nodes visited, for statistics.
+        self.nodes = 0
 
     def search(self, state, depth, maximizing_player):
         """Start the MiniMax algorithm.
 
-        :param state: The state to start from.
+        :param state: The state to start from. It is walked with make_move / undo_move, and is restored on return.
         :param depth: The maximum allowed depth for the algorithm.
         :param maximizing_player: Whether this is a max node (True) or a min node (False).
         :return: A tuple: (The min max algorithm value, The move in case of max node or None in min mode)
         """
+        self.nodes += 1
         # print("The current depth is:",depth)
         if depth == 0:
-            score = self.utility(state)  # TODO remove
+            score = leaf_score(self.utility, state, self.my_color)
             # print("at",maximizing_player, "score = ", score) # TODO remove
             return score, None
+        tt = self.transposition_table
+        if tt is not None:
+            entry = tt.probe(state.key)
+            if entry is not None and entry[1] >= depth:
+                return entry[3], entry[4]
         moves = state.get_possible_moves()
-        if len(moves) == 0: # no more moves from this state
-            return self.utility(state), None
+        if len(moves) == 0: # no more moves from this state, the game is over
+            return final_score(state, self.my_color), None
         if maximizing_player: # our turn lets MAX # TODO change this with corrlation to state or agent
             currMax = -INFINITY
             bestMove = moves[0]
             i = 0
             while not(self.no_more_time()) and i < len(moves):
-                next_state = copy.deepcopy(state)
-                next_state.perform_move(moves[i][0], moves[i][1])
-                v,_ = self.search(next_state,depth-1,False)
+                state.make_move(moves[i][0], moves[i][1])
+                v,_ = self.search(state,depth-1,False)
+                state.undo_move()
                 # print("At", depth, "depth best move is:", moves[i], "with score of:", v) # TODO remove
                 if currMax < v:
                     currMax = v
                     bestMove = moves[i]
                 i += 1
                 # print("At", depth, "depth best move is:", bestMove, "with score of:", currMax) # TODO remove
+            self.store(state, depth, currMax, bestMove)
             return currMax, bestMove
         else:              # not our turn lets MIN
             currMin = INFINITY
             i = 0
             while not (self.no_more_time()) and i < len(moves):
-                next_state = copy.deepcopy(state)
-                next_state.perform_move(moves[i][0], moves[i][1])
-                v,_ = self.search(next_state, depth - 1, True)
+                state.make_move(moves[i][0], moves[i][1])
+                v,_ = self.search(state, depth - 1, True)
+                state.undo_move()
                 # if currMax < v:
                 #     currMax = v
                 #     bestMove = moves[i]
                 currMin = min(v,currMin)
                 i += 1
+            self.store(state, depth, currMin, None)
             return currMin, None
 
+    def store(self, state, depth, score, move):
+        """Stores a node result in the transposition table, if there is one."""
+        # A search that ran out of time returns partial values, which must not be stored.
+        if self.transposition_table is None or self.no_more_time():
+            return
+        self.transposition_table.store(state.key, depth, EXACT, score, move)
+
+
+def aspiration_search(search, state, depth, guess, window):
+    """Searches the root of a MiniMaxWithAlphaBetaPruning with an aspiration window: a narrow window around the score
+    of an earlier iteration, which cuts off more. If the score falls outside of it, the side it failed on is opened
+    and the root is searched again.
+
+    :param search: The MiniMaxWithAlphaBetaPruning.search method.
+    :param state: The root state.
+    :param depth: The search depth.
+    :param guess: The expected score, or None to search with a full window. The heuristic scores swing between odd and
+                  even depths, so the score of the iteration 2 plies shallower is a better guess than the previous one.
+    :param window: The distance of alpha and beta from the guess.
+    :return: A tuple: (The alpha-beta algorithm value, The best move found)
+    """
+    if guess is None or abs(guess) >= INFINITY:
+        return search(state, depth, -INFINITY, INFINITY, True)
+    alpha, beta = guess - window, guess + window
+    while True:
+        score, move = search(state, depth, alpha, beta, True)
+        if score <= alpha and alpha > -INFINITY:
+            alpha = -INFINITY
+        elif score >= beta and beta < INFINITY:
+            beta = INFINITY
+        else:
+            return score, move
 
 
 class MiniMaxWithAlphaBetaPruning:
 
-    def __init__(self, utility, my_color, no_more_time, selective_deepening):
+    def __init__(self, utility, my_color, no_more_time, selective_deepening, transposition_table=None,
+                 move_orderer=None, eval_cache=None, pvs=False, late_move_reductions=None):
         """Initialize a MiniMax algorithms with alpha-beta pruning.
 
         :param utility: The utility function. Should have state as parameter.
         :param my_color: The color of the player who runs this MiniMax search.
         :param no_more_time: A function that returns true if there is no more time to run this search, or false if
                              there is still time left.
-        :param selective_deepening: A functions that gets the current state, and
-                        returns True when the algorithm should continue the search
-                        for the minimax value recursivly from this state.
+        :param selective_deepening: A forward pruning object, e.g. probcut.MultiProbCut, or False. Before a node is
+                        searched, its cut(search, state, depth, alpha, beta, maximizing_player) may return a tuple
+                        (score, move) to return for the node instead, or None to search it.
+        :param transposition_table: A transposition.TranspositionTable to store search results in, or None.
+                        optional
+        :param move_orderer: A move_ordering.MoveOrderer to sort the moves of each node with, or None to search them in
+                        the order of GameState.get_possible_moves. optional
+        :param eval_cache: An eval_cache.EvalCache that the utility calls go through, or None. optional
+        :param pvs: Whether to run a principal variation search: the first move of each node is searched with the
+                        node's window, and the rest with a null window, which only proves they are not better. A move
+                        that turns out better is searched again with the full window. optional
+        :param late_move_reductions: A reductions.LateMoveReductions, or None. The moves it reduces are first searched
+                        to the reduced depth with a null window, and only searched to the full depth (as above) when
+                        they are not proven worse than the best move so far. optional
         """
-        self.utility = utility
+        self.utility = utility if eval_cache is None else eval_cache.wrap(utility)
+        self.eval_cache = eval_cache
         self.my_color = my_color
         self.no_more_time = no_more_time
         self.selective_deepening = selective_deepening
+        self.pvs = pvs
+        self.late_move_reductions = late_move_reductions
+        # {position key: move} of the principal variation to search first, see seed_principal_variation.
+        self.pv_moves = {}
+        self.transposition_table = transposition_table
+        self.move_orderer = move_orderer
+        # Number of nodes visited, for statistics.
+        self.nodes = 0
 
     def search(self, state, depth, alpha, beta, maximizing_player):
         """Start the MiniMax algorithm.
 
-        :param state: The state to start from.
+        The search is fail-soft: a value <= alpha is an upper bound of the real value, and a value >= beta is a lower
+        bound of it.
+
+        :param state: The state to start from. It is walked with make_move / undo_move, and is restored on return.
         :param depth: The maximum allowed depth for the algorithm.
         :param alpha: The alpha of the alpha-beta pruning.
         :param beta: The beta of the alpha-beta pruning.
         :param maximizing_player: Whether this is a max node (True) or a min node (False).
-        :return: A tuple: (The alpha-beta algorithm value, The move in case of max node or None in min mode)
+        :return: A tuple: (The alpha-beta algorithm value, The best move found or None at a leaf)
         """
+        self.nodes += 1
         # print("The current depth is:",depth)
         if depth == 0:
-            score = self.utility(state)  # TODO remove
+            score = leaf_score(self.utility, state, self.my_color)
             # print("at",maximizing_player, "score = ", score) # TODO remove
             return score, None
+
+        hash_move = None
+        tt = self.transposition_table
+        if tt is not None:
+            entry = tt.probe(state.key)
+            if entry is not None:
+                hash_move = entry[4]
+            if entry is not None and entry[1] >= depth:
+                _, _, flag, score, move, _ = entry
+                if flag == EXACT:
+                    return score, move
+                elif flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, move
+        if self.selective_deepening:
+            cut = self.selective_deepening.cut(self, state, depth, alpha, beta, maximizing_player)
+            if cut is not None:
+                return cut
+        original_alpha, original_beta = alpha, beta
+        if self.pv_moves:
+            hash_move = self.pv_moves.get(state.key, hash_move)
+
         moves = state.get_possible_moves()
-        if len(moves) == 0:  # no more moves from this state
-            return self.utility(state), None
+        if len(moves) == 0:  # no more moves from this state, the game is over
+            return final_score(state, self.my_color), None
+        orderer = self.move_orderer
+        if orderer is not None:
+            ply = len(state.moves_played) // 2
+            moves = orderer.order(moves, ply, hash_move)
+        lmr = self.late_move_reductions
         if maximizing_player:  # our turn lets MAX # TODO change this with corrlation to state or agent
             currMax = -INFINITY
             bestMove = moves[0]
             i = 0
             while not(self.no_more_time()) and i < len(moves):
-                next_state = copy.deepcopy(state)
-                next_state.perform_move(moves[i][0], moves[i][1])
-                v, _ = self.search(next_state, depth - 1, alpha, beta, False)
+                state.make_move(moves[i][0], moves[i][1])
+                reduction = lmr.reduction(depth, i) if lmr is not None and i > 0 else 0
+                full_depth = True
+                if reduction:
+                    lmr.reduced += 1
+                    v, _ = self.search(state, depth - 1 - reduction, alpha, alpha + NULL_WINDOW, False)
+                    # A move proven worse at the reduced depth is not searched again.
+                    full_depth = v > alpha
+                    if full_depth:
+                        lmr.re_searched += 1
+                if full_depth and self.pvs and i > 0:
+                    v, _ = self.search(state, depth - 1, alpha, alpha + NULL_WINDOW, False)
+                    if alpha < v < beta:
+                        v, _ = self.search(state, depth - 1, alpha, beta, False)
+                elif full_depth:
+                    v, _ = self.search(state, depth - 1, alpha, beta, False)
+                state.undo_move()
                 # print("At", depth, "depth best move is:", moves[i], "with score of:", v) # TODO remove
                 if currMax < v: # should update max and best move
                     currMax = v
                     bestMove = moves[i]
                 alpha = max(currMax,alpha)
                 if currMax >= beta:
-                    return INFINITY, bestMove
+                    if orderer is not None:
+                        orderer.record_cutoff(bestMove, ply, depth)
+                    break
                 i += 1
                 # print("At", depth, "depth best move is:", bestMove, "with score of:", currMax) # TODO remove
+            self.store(state, depth, currMax, bestMove, original_alpha, original_beta)
             return currMax, bestMove
         else:  # not our turn lets MIN
             currMin = INFINITY
+            bestMove = moves[0]
             i = 0
             while not (self.no_more_time()) and i < len(moves):
-                next_state = copy.deepcopy(state)
-                next_state.perform_move(moves[i][0], moves[i][1])
-                v, _ = self.search(next_state, depth - 1, alpha, beta, True)
-                # if currMax < v:
-                #     currMax = v
-                #     bestMove = moves[i]
-                currMin = min(v, currMin)
+                state.make_move(moves[i][0], moves[i][1])
+                reduction = lmr.reduction(depth, i) if lmr is not None and i > 0 else 0
+                full_depth = True
+                if reduction:
+                    lmr.reduced += 1
+                    v, _ = self.search(state, depth - 1 - reduction, beta - NULL_WINDOW, beta, True)
+                    # A move proven worse at the reduced depth is not searched again.
+                    full_depth = v < beta
+                    if full_depth:
+                        lmr.re_searched += 1
+                if full_depth and self.pvs and i > 0:
+                    v, _ = self.search(state, depth - 1, beta - NULL_WINDOW, beta, True)
+                    if alpha < v < beta:
+                        v, _ = self.search(state, depth - 1, alpha, beta, True)
+                elif full_depth:
+                    v, _ = self.search(state, depth - 1, alpha, beta, True)
+                state.undo_move()
+                if v < currMin:
+                    currMin = v
+                    bestMove = moves[i]
                 beta = min(currMin,beta)
                 if currMin <= alpha:
-                    return -INFINITY, None
+                    if orderer is not None:
+                        orderer.record_cutoff(bestMove, ply, depth)
+                    break
                 i += 1
-            return currMin, None
+            self.store(state, depth, currMin, bestMove, original_alpha, original_beta)
+            return currMin, bestMove
+
+    def principal_variation(self, state, max_length=MAX_DEPTH):
+        """Returns the best moves from the state on, as stored in the transposition table and by
+        seed_principal_variation.
+        """
+        pv = []
+        tt = self.transposition_table
+        while len(pv) < max_length:
+            move = self.pv_moves.get(state.key)
+            if move is None and tt is not None:
+                entry = tt.probe(state.key)
+                move = entry[4] if entry is not None else None
+            if move is None or move not in state.get_possible_moves():
+                break
+            state.make_move(move[0], move[1])
+            pv.append(move)
+        for _ in pv:
+            state.undo_move()
+        return pv
+
+    def seed_principal_variation(self, state, pv):
+        """Makes the moves of a principal variation the first ones searched in their positions, even if the
+        transposition table has lost them.
+
+        :param state: The position the principal variation starts from.
+        :param pv: A list of moves.
+        """
+        self.pv_moves = {}
+        for move in pv:
+            self.pv_moves[state.key] = move
+            state.make_move(move[0], move[1])
+        for _ in pv:
+            state.undo_move()
+
+    def mtdf(self, state, depth, guess, max_passes=MTDF_MAX_PASSES):
+        """Finds the minimax value of the root with MTD(f): a series of null window searches, each of them proving that
+        the value is above or below a test value, which converge on the value. The searches visit the same nodes
+        again and again, so they need the transposition table.
+
+        :param state: The root state.
+        :param depth: The search depth.
+        :param guess: A guess of the value, e.g. the value of an earlier iteration. The closer, the fewer passes.
+        :param max_passes: The scores are floats, so the bounds may take many passes to meet. After this many passes,
+                           the rest of the range between the bounds is searched with one normal window.
+        :return: A tuple: (The alpha-beta algorithm value, The best move found)
+        """
+        lower, upper = -INFINITY, INFINITY
+        score = guess
+        best_move = None
+        passes = 0
+        while lower < upper:
+            if passes == max_passes:
+                score, move = self.search(state, depth, lower, upper, True)
+                return score, move if lower < score or best_move is None else best_move
+            beta = max(score, lower + NULL_WINDOW)
+            score, move = self.search(state, depth, beta - NULL_WINDOW, beta, True)
+            passes += 1
+            if score < beta:
+                upper = score
+            else:
+                # The moves of failed high passes are the ones proven to reach the lower bound.
+                lower = score
+                best_move = move
+            if best_move is None:
+                best_move = move
+        return score, best_move
+
+    def store(self, state, depth, score, move, alpha, beta):
+        """Stores a node result in the transposition table, if there is one.
+
+        :param alpha: The alpha the node was searched with.
+        :param beta: The beta the node was searched with.
+        """
+        # A search that ran out of time returns partial values, which must not be stored.
+        if self.transposition_table is None or self.no_more_time():
+            return
+        if score <= alpha:
+            flag = UPPER_BOUND
+        elif score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transposition_table.store(state.key, depth, flag, score, move)
+
+
+class IterativeDeepening:
+    """Iterative deepening driver for a MiniMaxWithAlphaBetaPruning, which searches the root moves itself:
+    - The root moves are searched in the order of the previous iteration's scores, and the previous principal variation
+      is searched first in the nodes below (see MiniMaxWithAlphaBetaPruning.seed_principal_variation).
+    - When the time runs out in the middle of an iteration, the best move found so far in it is kept. The previous best
+      move is searched first, so any other move that was found better is better at the new depth too.
+    - A forced move is returned at once, and a new depth is not started when it is predicted to take much longer than
+      the time that is left.
+    - Each iteration can be searched with an aspiration window, and its root moves can be split between processes (see
+      parallel.ParallelRootSearch), or searched with the help of Lazy-SMP workers (see parallel.LazySMPSearch).
+    """
+
+    # A new depth is not started if it is predicted to take more than this many times the time left.
+    HOPELESS_FACTOR = 2.0
+    # Bounds of the predicted ratio between the run times of consecutive depths.
+    MIN_BRANCHING = 2.0
+    MAX_BRANCHING = 10.0
+
+    def __init__(self, alpha_beta, no_more_time, time_left, aspiration_window=0.0, parallel=None):
+        """Initialize the driver.
+
+        :param alpha_beta: The MiniMaxWithAlphaBetaPruning to search with. The root is max node.
+        :param no_more_time: A function that returns true if there is no more time to run the search.
+        :param time_left: A function that returns the number of seconds left for the search.
+        :param aspiration_window: The distance of alpha and beta from the score of 2 iterations before, or 0 for full
+                        windows. See aspiration_search. optional
+        :param parallel: A parallel.ParallelRootSearch or parallel.LazySMPSearch to search the root moves with, or
+                        None to search them in this process. optional
+        """
+        self.alpha_beta = alpha_beta
+        self.no_more_time = no_more_time
+        self.time_left = time_left
+        self.aspiration_window = aspiration_window
+        self.parallel = parallel
+        # Results of the last run: the deepest completed depth, the scores of the completed depths, the principal
+        # variation and the keys of the positions along it (starting with the root).
+        self.depth = 0
+        self.scores = []
+        self.pv = []
+        self.pv_keys = []
+
+    def run(self, state, moves, start_depth=1, max_depth=MAX_DEPTH, resume=None):
+        """Searches deeper and deeper until the time is up.
+
+        :param state: The root state. It is walked with make_move / undo_move, and is restored on return.
+        :param moves: The possible moves of the root.
+        :param start_depth: The first depth to search.
+        :param max_depth: The search stops before this depth.
+        :param resume: The result of an earlier run on the same position (see result), to continue from instead of
+                       starting at start_depth. optional
+        :return: The best move.
+        """
+        self.depth = 0
+        self.scores = []
+        self.pv = []
+        self.pv_keys = []
+        if len(moves) == 1:
+            return moves[0]
+        root_moves = list(moves)
+        if self.alpha_beta.move_orderer is not None:
+            root_moves = self.alpha_beta.move_orderer.order(root_moves, len(state.moves_played) // 2)
+        if resume is not None:
+            self.depth, self.scores, self.pv = resume[0], list(resume[1]), list(resume[2])
+            start_depth = self.depth + 1
+            root_moves.remove(self.pv[0])
+            root_moves.insert(0, self.pv[0])
+            self.alpha_beta.seed_principal_variation(state, self.pv)
+        best_move = root_moves[0]
+        depth = start_depth
+        previous_time = last_time = None
+        while depth < max_depth and not self.no_more_time():
+            if last_time is not None and self.predict_time(previous_time, last_time) > \
+                    IterativeDeepening.HOPELESS_FACTOR * self.time_left():
+                break
+            start = time.time()
+            score, move, completed = self.search_iteration(state, depth, root_moves)
+            if move is not None:
+                best_move = move
+            if completed is None:
+                break
+            previous_time, last_time = last_time, time.time() - start
+            self.depth = depth
+            self.scores.append(score)
+            # The moves that were not searched because of a cutoff keep their order, after the searched ones.
+            searched = [searched_move for _, searched_move in sorted(completed, key=lambda result: -result[0])]
+            root_moves = searched + [root_move for root_move in root_moves if root_move not in searched]
+            state.make_move(move[0], move[1])
+            self.pv = [move] + self.alpha_beta.principal_variation(state, depth - 1)
+            state.undo_move()
+            self.alpha_beta.seed_principal_variation(state, self.pv)
+            if abs(score) >= INFINITY:
+                # The game is decided: the leaves without moves are scored by their final result (see leaf_score).
+                break
+            depth += 1
+        self.pv_keys = [state.key]
+        for move in self.pv:
+            state.make_move(move[0], move[1])
+            self.pv_keys.append(state.key)
+        for _ in self.pv:
+            state.undo_move()
+        return best_move
+
+    def result(self):
+        """Returns the result of the last run, which a later run on the same position can resume from: a tuple (the
+        deepest completed depth, the scores of the completed depths, the principal variation).
+        """
+        return self.depth, list(self.scores), list(self.pv)
+
+    def carry_over(self, state):
+        """Carries the result of the last run over to a later position on its principal variation, e.g. the root of our
+        next move when the opponent played the predicted reply. The principal variation was searched to the full depth,
+        so a run resumed from the carried result (see run) starts deeper than the plies already played, and the
+        transposition table answers the shallower depths.
+
+        :param state: The new root. Its side to move must be the one of the last run's root.
+        :return: The result to resume from, or None if the state is not on the principal variation.
+        """
+        for plies in range(2, len(self.pv), 2):
+            if self.pv_keys[plies] == state.key:
+                return self.depth - plies, self.scores[plies:], self.pv[plies:]
+        return None
+
+    def predict_time(self, previous_time, last_time):
+        """Predicts the run time of the next depth from the run times of the last two."""
+        if not previous_time:
+            return last_time * IterativeDeepening.MIN_BRANCHING
+        branching = min(max(last_time / previous_time, IterativeDeepening.MIN_BRANCHING),
+                        IterativeDeepening.MAX_BRANCHING)
+        return last_time * branching
+
+    def search_iteration(self, state, depth, moves):
+        """Searches the root to a given depth, re-searching when the score falls outside of the aspiration window.
+
+        :return: A tuple: (the score, the best move, a list of (score, move) of all the searched moves). If the time ran
+                 out, the list is None, and the best move is the best one found if it is proven better than the first
+                 move, or None otherwise.
+        """
+        guess = self.scores[-2] if self.aspiration_window and len(self.scores) >= 2 else None
+        if guess is None or abs(guess) >= INFINITY:
+            alpha, beta = -INFINITY, INFINITY
+        else:
+            alpha, beta = guess - self.aspiration_window, guess + self.aspiration_window
+        while True:
+            if self.parallel is not None:
+                score, move, completed = self.parallel.search_root(self.alpha_beta, state, depth, moves, alpha, beta,
+                                                                   time.time() + self.time_left())
+            else:
+                score, move, completed = self.search_root(state, depth, moves, alpha, beta)
+            if completed is None or self.no_more_time():
+                if move is not None and move != moves[0] and score > alpha:
+                    return score, move, None
+                return None, None, None
+            if score <= alpha and alpha > -INFINITY:
+                alpha = -INFINITY
+            elif score >= beta and beta < INFINITY:
+                beta = INFINITY
+            else:
+                return score, move, completed
+
+    def search_root(self, state, depth, moves, alpha, beta):
+        """Searches the root moves in order, in this process. See search_root_moves."""
+        return search_root_moves(self.alpha_beta, state, depth, moves, alpha, beta, self.no_more_time)
+
+
+def search_root_moves(alpha_beta, state, depth, moves, alpha, beta, no_more_time):
+    """Searches the root moves in order, with a null window after the first one if alpha_beta.pvs is set.
+
+    :param alpha_beta: The MiniMaxWithAlphaBetaPruning to search with. The root is max node.
+    :param no_more_time: A function that returns true if there is no more time to run the search.
+    :return: A tuple: (the fail-soft score, the best move, a list of (score, move) of the searched moves). Moves whose
+             search was cut by the time are left out.
+    """
+    best_score, best_move = None, None
+    completed = []
+    for i, move in enumerate(moves):
+        state.make_move(move[0], move[1])
+        if alpha_beta.pvs and i > 0:
+            score, _ = alpha_beta.search(state, depth - 1, alpha, alpha + NULL_WINDOW, False)
+            if alpha < score < beta:
+                score, _ = alpha_beta.search(state, depth - 1, alpha, beta, False)
+        else:
+            score, _ = alpha_beta.search(state, depth - 1, alpha, beta, False)
+        state.undo_move()
+        if no_more_time():
+            break
+        completed.append((score, move))
+        if best_score is None or score > best_score:
+            best_score, best_move = score, move
+        alpha = max(alpha, score)
+        if score >= beta:
+            break
+    return best_score, best_move, completed
 
 
 class Book: